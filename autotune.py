@@ -0,0 +1,321 @@
+"""
+Calibration of the OCR topology for the machine the service runs on.
+
+Tesseract's OpenMP threads, parallel pages within a document and concurrent
+documents (inline requests or worker processes) all compete for the same
+cores. Calibration runs a short built-in workload of synthetic report PDFs
+through OCRService for each combination that keeps every core busy without
+heavy oversubscription, and keeps the one with the highest page throughput:
+
+    python autotune.py --trial-seconds 10
+
+The result is saved as JSON (OCR_TOPOLOGY_FILE, default ocr_topology.json),
+where the API and worker.py pick it up at startup. The API can also
+calibrate on startup or on demand; see POST /admin/calibrate.
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import fitz  # PyMuPDF
+
+from ocr_service import OCRService
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOPOLOGY_FILE = "ocr_topology.json"
+
+# Seconds each candidate topology is measured for
+DEFAULT_TRIAL_SECONDS = 10.0
+
+# Built-in workload: distinct documents, cycled through during each trial
+WORKLOAD_DOCUMENTS = 4
+PAGES_PER_DOCUMENT = 4
+
+# Total threads (documents x pages x Tesseract threads) allowed per core;
+# some oversubscription pays off while threads wait on PNG encoding and I/O.
+# Fewer threads than cores leaves cores idle, so those are not tried either
+MAX_OVERSUBSCRIPTION = 2
+
+# Tesseract gains little from more OpenMP threads than this, and documents
+# rarely have enough pages to keep more page workers busy
+MAX_TESSERACT_THREADS = 4
+MAX_PAGE_WORKERS = 4
+
+# Upper bound on a whole calibration; trials are shortened to fit
+MAX_CALIBRATION_SECONDS = 120.0
+
+# Topologies within this fraction of the best throughput count as a tie,
+# which goes to the one using fewer threads
+TIE_TOLERANCE = 0.03
+
+class Topology(NamedTuple):
+    """How OCR work is spread over the cores of one machine"""
+    workers: int  # documents processed at the same time (inline requests or worker processes)
+    page_workers: int  # pages of one document OCR'd at the same time
+    tesseract_threads: int  # OpenMP threads per Tesseract process
+    pages_per_second: Optional[float] = None
+    cpu_count: Optional[int] = None
+    calibrated_at: Optional[float] = None
+
+def load_topology(path: str) -> Optional[Topology]:
+    """
+    Load a saved topology
+
+    Args:
+        path: Path of the topology JSON file
+
+    Returns:
+        Optional[Topology]: Saved topology, or None if there is none or it cannot be read
+    """
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path, encoding='utf-8') as f:
+            return Topology(**json.load(f))
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable topology file {path}: {str(e)}")
+        return None
+
+def save_topology(topology: Topology, path: str) -> None:
+    """
+    Save a topology, replacing the file atomically
+
+    Args:
+        topology: Topology to save
+        path: Path of the topology JSON file
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile('w', dir=directory, suffix='.tmp', delete=False, encoding='utf-8') as f:
+        json.dump(topology._asdict(), f, indent=2)
+    os.replace(f.name, path)
+
+def apply_topology(ocr_service: OCRService, topology: Topology) -> None:
+    """
+    Apply the per-document settings of a topology to an OCR service
+
+    The number of workers is applied by the caller: the API limits its
+    concurrent OCR requests, worker.py starts that many processes.
+
+    Args:
+        ocr_service: OCR service to configure
+        topology: Topology to apply
+    """
+    ocr_service.page_workers = topology.page_workers
+    ocr_service.tesseract_threads = topology.tesseract_threads
+    logger.info(f"Using OCR topology: {topology.workers} worker(s), {topology.page_workers} page worker(s), "
+                f"{topology.tesseract_threads} Tesseract thread(s)")
+
+def candidate_topologies(cpu_count: int) -> List[Tuple[int, int, int]]:
+    """
+    List the combinations worth measuring on a machine
+
+    Each setting takes powers of two up to the core count (and the core
+    count itself), capped at MAX_PAGE_WORKERS and MAX_TESSERACT_THREADS.
+    Only combinations using between one and MAX_OVERSUBSCRIPTION threads
+    per core are kept, which leaves at most 17 on any machine.
+
+    Args:
+        cpu_count: Number of cores
+
+    Returns:
+        List[Tuple[int, int, int]]: (workers, page_workers, tesseract_threads)
+        combinations, fewest threads first
+    """
+    counts = sorted({2 ** i for i in range(cpu_count.bit_length()) if 2 ** i <= cpu_count} | {cpu_count})
+    page_worker_counts = [n for n in counts if n <= MAX_PAGE_WORKERS]
+    thread_counts = [n for n in counts if n <= MAX_TESSERACT_THREADS]
+
+    candidates = [
+        (workers, page_workers, threads)
+        for workers in counts
+        for page_workers in page_worker_counts
+        for threads in thread_counts
+        if cpu_count <= workers * page_workers * threads <= cpu_count * MAX_OVERSUBSCRIPTION
+    ]
+    return sorted(candidates, key=lambda c: (c[0] * c[1] * c[2], c))
+
+def build_workload(directory: str, documents: int = WORKLOAD_DOCUMENTS,
+                   pages_per_document: int = PAGES_PER_DOCUMENT) -> List[str]:
+    """
+    Write synthetic medical report PDFs to OCR during calibration
+
+    Every page has different text, so the workload is the same wherever it
+    runs and nothing is shared between pages.
+
+    Args:
+        directory: Directory to write the PDFs to
+        documents: Number of documents
+        pages_per_document: Pages in each document
+
+    Returns:
+        List[str]: Paths of the PDFs
+    """
+    paths = []
+    for doc_num in range(documents):
+        doc = fitz.open()
+        for page_num in range(pages_per_document):
+            n = doc_num * pages_per_document + page_num
+            lines = [
+                "MEDICAL REPORT",
+                f"Patient Name: Calibration Patient {n}",
+                f"Patient ID: CAL{100000 + n}",
+                f"Date of Birth: {1 + n % 28:02d}/{1 + n % 12:02d}/19{50 + n % 50}",
+                f"Referring Physician: Dr. Example {n}",
+                f"Date of Report: {1 + n % 28:02d}/{1 + n % 12:02d}/2024",
+                "",
+            ]
+            lines += [
+                f"Finding {i + 1}: Lesion measuring {i + 2}.{n % 10} cm in segment {i % 8 + 1}, "
+                f"no change since prior study."
+                for i in range(30)
+            ]
+
+            page = doc.new_page()  # A4
+            for i, line in enumerate(lines):
+                page.insert_text((56, 64 + i * 20), line, fontsize=10)
+
+        path = os.path.join(directory, f"calibration_{doc_num}.pdf")
+        doc.save(path)
+        doc.close()
+        paths.append(path)
+    return paths
+
+def measure_throughput(ocr_service: OCRService, paths: List[str], workers: int,
+                       trial_seconds: float) -> Dict[str, float]:
+    """
+    Measure page throughput with a number of documents in flight
+
+    Workers are threads here, which matches the API; worker.py processes
+    behave the same since the work happens in Tesseract subprocesses.
+    Documents started within the trial are finished, so each worker
+    completes at least one.
+
+    Args:
+        ocr_service: Configured OCR service, without a page cache
+        paths: Workload documents, cycled through
+        workers: Documents processed at the same time
+        trial_seconds: How long to keep starting new documents
+
+    Returns:
+        Dict[str, float]: Pages, seconds and pages per second
+    """
+    page_counts = {}
+    for path in paths:
+        with fitz.open(path) as doc:
+            page_counts[path] = len(doc)
+
+    lock = threading.Lock()
+    pages = 0
+    next_document = 0
+    started = time.monotonic()
+
+    def work() -> None:
+        nonlocal pages, next_document
+        while True:
+            with lock:
+                if next_document >= workers and time.monotonic() - started >= trial_seconds:
+                    return
+                path = paths[next_document % len(paths)]
+                next_document += 1
+
+            ocr_service.extract_text(path)
+
+            with lock:
+                pages += page_counts[path]
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='calibration') as executor:
+        for future in [executor.submit(work) for _ in range(workers)]:
+            future.result()
+
+    elapsed = time.monotonic() - started
+    return {'pages': pages, 'seconds': round(elapsed, 3), 'pages_per_second': round(pages / elapsed, 3)}
+
+def pick_best(trials: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Pick the fastest measured topology, preferring fewer threads on a near-tie
+
+    Args:
+        trials: Measurements from calibrate()
+
+    Returns:
+        Dict[str, Any]: The leanest trial within TIE_TOLERANCE of the best throughput
+    """
+    best_rate = max(trial['pages_per_second'] for trial in trials)
+    leanest_first = sorted(trials, key=lambda t: t['workers'] * t['page_workers'] * t['tesseract_threads'])
+    return next(trial for trial in leanest_first if trial['pages_per_second'] >= best_rate * (1 - TIE_TOLERANCE))
+
+def calibrate(trial_seconds: float = DEFAULT_TRIAL_SECONDS,
+              candidates: Optional[Iterable[Tuple[int, int, int]]] = None,
+              max_seconds: float = MAX_CALIBRATION_SECONDS) -> Tuple[Topology, List[Dict[str, Any]]]:
+    """
+    Measure candidate topologies on the built-in workload and pick the fastest
+
+    Args:
+        trial_seconds: Seconds to measure each candidate for
+        candidates: (workers, page_workers, tesseract_threads) combinations,
+            defaults to candidate_topologies() for this machine
+        max_seconds: Time budget for all trials; trial_seconds is shortened to fit
+
+    Returns:
+        Tuple[Topology, List[Dict[str, Any]]]: Best topology and the measurement of every candidate
+    """
+    cpu_count = os.cpu_count() or 1
+    candidates = list(candidates or candidate_topologies(cpu_count))
+    trial_seconds = min(trial_seconds, max_seconds / len(candidates))
+    logger.info(f"Calibrating OCR topology: {len(candidates)} candidate(s), {trial_seconds}s each, {cpu_count} core(s)")
+
+    trials = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        paths = build_workload(temp_dir)
+
+        # Warm up so the first trial does not pay for loading the language data
+        OCRService(tesseract_threads=1).extract_text(paths[0])
+
+        for workers, page_workers, threads in candidates:
+            ocr_service = OCRService(page_workers=page_workers, tesseract_threads=threads)
+            result = measure_throughput(ocr_service, paths, workers, trial_seconds)
+            trials.append({'workers': workers, 'page_workers': page_workers, 'tesseract_threads': threads, **result})
+            logger.info(f"Calibration: {workers} worker(s) x {page_workers} page worker(s) x "
+                        f"{threads} Tesseract thread(s): {result['pages_per_second']} pages/s")
+
+    best = pick_best(trials)
+
+    topology = Topology(
+        workers=best['workers'],
+        page_workers=best['page_workers'],
+        tesseract_threads=best['tesseract_threads'],
+        pages_per_second=best['pages_per_second'],
+        cpu_count=cpu_count,
+        calibrated_at=time.time()
+    )
+    return topology, trials
+
+def main() -> None:
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description="Calibrate the OCR topology for this machine")
+    parser.add_argument('--trial-seconds', type=float, default=DEFAULT_TRIAL_SECONDS,
+                        help=f"Seconds to measure each candidate for (default: {DEFAULT_TRIAL_SECONDS})")
+    parser.add_argument('--max-seconds', type=float, default=MAX_CALIBRATION_SECONDS,
+                        help=f"Time budget for all candidates (default: {MAX_CALIBRATION_SECONDS})")
+    parser.add_argument('--output', default=os.environ.get("OCR_TOPOLOGY_FILE", DEFAULT_TOPOLOGY_FILE),
+                        help="Topology file to write (default: $OCR_TOPOLOGY_FILE or ocr_topology.json)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    logging.getLogger('ocr_service').setLevel(logging.WARNING)
+
+    topology, trials = calibrate(args.trial_seconds, max_seconds=args.max_seconds)
+    save_topology(topology, args.output)
+
+    print(json.dumps({'topology': topology._asdict(), 'trials': trials}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+import json
+import os
+import sqlite3
+import time
+import uuid
+import logging
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# Task states
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+class BrokerTask(NamedTuple):
+    """Document-level OCR task handed to a worker"""
+    id: str
+    filename: str
+    payload: bytes
+    options: Dict[str, Any]
+    attempts: int
+
+class Broker(ABC):
+    """Queue of OCR tasks shared between the API and worker processes"""
+
+    @abstractmethod
+    def enqueue(self, payload: bytes, filename: str, options: Dict[str, Any]) -> str:
+        """
+        Queue a document for OCR
+
+        Args:
+            payload: File contents
+            filename: Original filename; its extension selects the decoder
+            options: Processing options, e.g. mode and deadline_at (epoch seconds)
+
+        Returns:
+            str: Task ID
+        """
+
+    @abstractmethod
+    def claim(self, worker_id: str, visibility_timeout: float) -> Optional[BrokerTask]:
+        """
+        Lease the next queued task, or one whose worker stopped heartbeating
+
+        Args:
+            worker_id: Identity of the claiming worker
+            visibility_timeout: Seconds the task stays invisible to other workers
+
+        Returns:
+            Optional[BrokerTask]: Leased task or None if the queue is empty
+        """
+
+    @abstractmethod
+    def extend(self, task_id: str, worker_id: str, visibility_timeout: float) -> bool:
+        """
+        Renew a lease while the task is being processed
+
+        Args:
+            task_id: Leased task
+            worker_id: Worker holding the lease
+            visibility_timeout: New lease duration in seconds
+
+        Returns:
+            bool: False if the lease was lost or the task deleted, so work should stop
+        """
+
+    @abstractmethod
+    def complete(self, task_id: str, worker_id: str, result: Dict[str, Any]) -> None:
+        """
+        Store the result of a leased task
+
+        Args:
+            task_id: Leased task
+            worker_id: Worker holding the lease
+            result: Formatted response content
+        """
+
+    @abstractmethod
+    def fail(self, task_id: str, worker_id: str, error: str, status_code: int = 500,
+             retry: bool = True) -> None:
+        """
+        Record a failed attempt, requeueing the task while attempts remain
+
+        Args:
+            task_id: Leased task
+            worker_id: Worker holding the lease
+            error: Error message
+            status_code: HTTP status code to report if the task fails for good
+            retry: False for errors that will not go away on retry
+        """
+
+    @abstractmethod
+    def get_status(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a task's state
+
+        Args:
+            task_id: Task to look up
+
+        Returns:
+            Optional[Dict[str, Any]]: status, attempts, result, error and
+            status_code, or None for an unknown task
+        """
+
+    @abstractmethod
+    def delete(self, task_id: str) -> None:
+        """
+        Forget a task once its result has been collected or is no longer wanted;
+        a worker still processing it stops at its next heartbeat
+
+        Args:
+            task_id: Task to delete
+        """
+
+    @abstractmethod
+    def stats(self) -> Dict[str, int]:
+        """
+        Count tasks by state
+
+        Returns:
+            Dict[str, int]: Number of tasks in each state
+        """
+
+class SQLiteBroker(Broker):
+    """
+    Broker backed by a SQLite file on a local disk
+
+    Single-host only: WAL mode and SQLite's locking are not reliable on
+    network filesystems, where two workers could lease the same task.
+    """
+
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS tasks (
+            id TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            filename TEXT NOT NULL,
+            payload BLOB,
+            options TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL,
+            lease_owner TEXT,
+            lease_expires REAL,
+            result TEXT,
+            error TEXT,
+            status_code INTEGER,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, created_at);
+    '''
+
+    def __init__(self, path: str, max_attempts: int = 3, retention_seconds: float = 3600.0):
+        """
+        Initialize broker, creating the database if needed
+
+        Args:
+            path: Path of the SQLite database file
+            max_attempts: Attempts per task before it is marked failed
+            retention_seconds: How long finished tasks nobody collected are kept
+        """
+        self.path = path
+        self.max_attempts = max_attempts
+        self.retention_seconds = retention_seconds
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(self.SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection; one per call keeps the broker safe across threads and processes"""
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def enqueue(self, payload: bytes, filename: str, options: Dict[str, Any]) -> str:
+        task_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT INTO tasks (id, status, filename, payload, options, max_attempts, created_at, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (task_id, QUEUED, filename, payload, json.dumps(options), self.max_attempts, now, now)
+            )
+        logger.info(f"Enqueued task {task_id} for {filename}")
+        return task_id
+
+    def claim(self, worker_id: str, visibility_timeout: float) -> Optional[BrokerTask]:
+        now = time.time()
+        with self._connect() as conn:
+            # Take the write lock up front so two workers cannot lease the same row
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = self._lease_next(conn, worker_id, visibility_timeout, now)
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+
+        if row is None:
+            return None
+
+        return BrokerTask(
+            id=row['id'],
+            filename=row['filename'],
+            payload=row['payload'],
+            options=json.loads(row['options']),
+            attempts=row['attempts'] + 1
+        )
+
+    def _lease_next(self, conn: sqlite3.Connection, worker_id: str, visibility_timeout: float,
+                    now: float) -> Optional[sqlite3.Row]:
+        """Lease the oldest claimable task inside the caller's transaction"""
+        # Results are normally deleted once collected; drop those whose client went away
+        conn.execute(
+            'DELETE FROM tasks WHERE status IN (?, ?) AND updated_at < ?',
+            (DONE, FAILED, now - self.retention_seconds)
+        )
+
+        # Tasks whose worker died on the last allowed attempt are not retried
+        conn.execute(
+            'UPDATE tasks SET status = ?, error = ?, status_code = 500, payload = NULL, updated_at = ? '
+            'WHERE status = ? AND lease_expires < ? AND attempts >= max_attempts',
+            (FAILED, "Worker stopped responding on every attempt", now, RUNNING, now)
+        )
+
+        row = conn.execute(
+            'SELECT id, filename, payload, options, attempts FROM tasks '
+            'WHERE status = ? OR (status = ? AND lease_expires < ?) '
+            'ORDER BY created_at LIMIT 1',
+            (QUEUED, RUNNING, now)
+        ).fetchone()
+
+        if row is not None:
+            conn.execute(
+                'UPDATE tasks SET status = ?, lease_owner = ?, lease_expires = ?, attempts = attempts + 1, '
+                'updated_at = ? WHERE id = ?',
+                (RUNNING, worker_id, now + visibility_timeout, now, row['id'])
+            )
+        return row
+
+    def extend(self, task_id: str, worker_id: str, visibility_timeout: float) -> bool:
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                'UPDATE tasks SET lease_expires = ?, updated_at = ? '
+                'WHERE id = ? AND status = ? AND lease_owner = ?',
+                (now + visibility_timeout, now, task_id, RUNNING, worker_id)
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, task_id: str, worker_id: str, result: Dict[str, Any]) -> None:
+        with self._connect() as conn:
+            cursor = conn.execute(
+                'UPDATE tasks SET status = ?, result = ?, payload = NULL, lease_owner = NULL, updated_at = ? '
+                'WHERE id = ? AND status = ? AND lease_owner = ?',
+                (DONE, json.dumps(result), time.time(), task_id, RUNNING, worker_id)
+            )
+        if cursor.rowcount != 1:
+            logger.warning(f"Discarded result of task {task_id}: lease no longer held by {worker_id}")
+
+    def fail(self, task_id: str, worker_id: str, error: str, status_code: int = 500,
+             retry: bool = True) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                'UPDATE tasks SET '
+                'status = CASE WHEN ? AND attempts < max_attempts THEN ? ELSE ? END, '
+                'payload = CASE WHEN ? AND attempts < max_attempts THEN payload ELSE NULL END, '
+                'error = ?, status_code = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ? '
+                'WHERE id = ? AND status = ? AND lease_owner = ?',
+                (retry, QUEUED, FAILED, retry, error, status_code, time.time(), task_id, RUNNING, worker_id)
+            )
+
+    def get_status(self, task_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT status, attempts, result, error, status_code FROM tasks WHERE id = ?',
+                (task_id,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        return {
+            'status': row['status'],
+            'attempts': row['attempts'],
+            'result': json.loads(row['result']) if row['result'] else None,
+            'error': row['error'],
+            'status_code': row['status_code']
+        }
+
+    def delete(self, task_id: str) -> None:
+        with self._connect() as conn:
+            conn.execute('DELETE FROM tasks WHERE id = ?', (task_id,))
+
+    def stats(self) -> Dict[str, int]:
+        with self._connect() as conn:
+            rows = conn.execute('SELECT status, COUNT(*) AS n FROM tasks GROUP BY status').fetchall()
+        counts = {status: 0 for status in (QUEUED, RUNNING, DONE, FAILED)}
+        counts.update({row['status']: row['n'] for row in rows})
+        return counts
+
+def create_broker(url: str) -> Broker:
+    """
+    Create a broker from a URL
+
+    Args:
+        url: Broker URL; currently only sqlite:///path/to/queue.db
+
+    Returns:
+        Broker: Configured broker
+    """
+    scheme, sep, location = url.partition('://')
+    if scheme == 'sqlite' and sep:
+        # sqlite:///relative.db and sqlite:////absolute/path.db, as in SQLAlchemy
+        return SQLiteBroker(location[1:] if location.startswith('/') else location)
+    raise ValueError(f"Unsupported broker URL: {url}")
@@ -0,0 +1,91 @@
+import logging
+from typing import Optional
+
+from ocr_service import OCRService, OCRInterrupted, CancellationToken
+from field_parser import FieldParser
+from utils import format_medical_response
+
+logger = logging.getLogger(__name__)
+
+NO_TEXT_DETAIL = "No text could be extracted from the uploaded file. Please ensure the file contains readable text."
+
+class ExtractionError(Exception):
+    """Extraction failure that maps to an HTTP error response"""
+
+    def __init__(self, status_code: int, detail: str):
+        """
+        Initialize extraction error
+
+        Args:
+            status_code: HTTP status code to report
+            detail: Error message for the client
+        """
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+def extract_report(ocr_service: OCRService, field_parser: FieldParser, file_path: str, filename: str,
+                   mode: str, token: Optional[CancellationToken] = None) -> dict:
+    """
+    Run OCR and field parsing on a saved file
+
+    Shared by the API (inline processing) and the broker workers.
+
+    Args:
+        ocr_service: OCR service to extract text or words with
+        field_parser: Parser for the medical fields
+        file_path: Path of the file to process
+        filename: Original filename, for logging
+        mode: 'text' or 'layout'
+        token: Optional deadline/cancellation token
+
+    Returns:
+        dict: Formatted response content, with "partial" and "pages_completed"
+        when the deadline ran out part-way
+
+    Raises:
+        ExtractionError: 422 if no text was found, 504 if the deadline ran out
+            before any page finished, 499 if the work was cancelled
+    """
+    extract = ocr_service.extract_words if mode == 'layout' else ocr_service.extract_text
+    pages_completed = None
+    try:
+        extracted = extract(file_path, token)
+    except OCRInterrupted as e:
+        if e.reason == 'cancelled':
+            raise ExtractionError(499, "Client closed request")
+        if e.pages_completed == 0:
+            raise ExtractionError(504, "Processing deadline exceeded before any page was completed")
+        # Deadline hit part-way: parse what the finished pages produced
+        extracted, pages_completed = e.partial, e.pages_completed
+        logger.warning(f"Deadline exceeded for {filename}, returning partial result from {pages_completed} page(s)")
+
+    if mode == 'layout':
+        # Pair labels with values by word-box position
+        words = extracted
+
+        if not words:
+            raise ExtractionError(422, NO_TEXT_DETAIL)
+
+        logger.info(f"Extracted {len(words)} words")
+
+        medical_data = field_parser.parse_from_words(words)
+    else:
+        extracted_text = extracted
+
+        if not extracted_text.strip():
+            raise ExtractionError(422, NO_TEXT_DETAIL)
+
+        logger.info(f"Extracted text length: {len(extracted_text)} characters")
+
+        # Parse medical fields from extracted text
+        medical_data = field_parser.parse_medical_fields(extracted_text)
+
+    logger.info(f"Successfully processed file: {filename}")
+
+    # Format response using utility function for better readability
+    formatted_response = format_medical_response(medical_data)
+    if pages_completed is not None:
+        formatted_response["partial"] = True
+        formatted_response["pages_completed"] = pages_completed
+    return formatted_response
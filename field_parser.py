@@ -1,16 +1,21 @@
 import re
-from typing import Dict, Optional, List
-from models import MedicalReportData, PatientInfo, ReportDetails
+from typing import Dict, Optional, List, Tuple
+from models import MedicalReportData, PatientInfo, ReportDetails, WordBox
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Longest label, in OCR tokens, that the layout parser tries to match
+MAX_LABEL_TOKENS = 3
+
 class FieldParser:
     """Parser for extracting structured medical report fields from text"""
     
     def __init__(self):
         """Initialize field parser with regex patterns"""
         self.patterns = self._compile_patterns()
+        self.label_index = self._build_label_index()
+        self.value_patterns = self._compile_value_patterns()
     
     def _compile_patterns(self) -> Dict[str, re.Pattern]:
         """
@@ -103,6 +108,64 @@ class FieldParser:
         
         return patterns
     
+    def _build_label_index(self) -> Dict[str, str]:
+        """
+        Build lookup of normalized label text to field name for layout parsing
+        
+        Labels are normalized with _normalize_label, so "Accession number",
+        "Accessionnumber" and "ACCESSION NUMBER:" all share one entry.
+        
+        Returns:
+            Dict[str, str]: Normalized label to field name
+        """
+        labels = {
+            # Report Details Labels
+            'user_name': ['username'],
+            'created_on': ['createdon'],
+            'license_id': ['licenseid'],
+            'physician': ['physician'],
+            'institution_name': ['institutionname'],
+            'institution_address': ['institutionaddress'],
+            'department_name': ['departmentname'],
+            
+            # Patient Information Labels
+            'patient_name': ['name', 'patientname'],
+            'patient_id': ['patientid'],
+            'sex': ['sex', 'gender'],
+            'birthdate_age': ['birthdateage', 'birthdate'],
+            'accession_number': ['accessionnumber'],
+            'referring_physician': ['referringphysician'],
+            'study_id': ['studyid'],
+            'height': ['height'],
+            'weight': ['weight'],
+            'bsa': ['bsa'],
+            'acquisition_date': ['acquisitiondate'],
+            'comments': ['comments']
+        }
+        
+        return {label: field_name for field_name, names in labels.items() for label in names}
+    
+    def _compile_value_patterns(self) -> Dict[str, re.Pattern]:
+        """
+        Compile patterns that values of strictly formatted fields must start with
+        
+        Only applied to the short value found next to a label, never to
+        the full page text.
+        
+        Returns:
+            Dict[str, re.Pattern]: Compiled value patterns
+        """
+        return {
+            'created_on': re.compile(r'\d{1,2}\/\d{1,2}\/\d{4}\s*\d{1,2}:\d{2}:\d{2}|\d{1,2}\/\d{1,2}\/\d{4}'),
+            'license_id': re.compile(r'\d+'),
+            'physician': re.compile(r'(?:DR\.\s*[A-Z]+\/)*DR\.\s*[A-Z]+', re.IGNORECASE),
+            'patient_id': re.compile(r'[A-Z]{1,3}\/\d+\/\d+[YM]?'),
+            'sex': re.compile(r'(?:male|female|m|f)\b', re.IGNORECASE),
+            'accession_number': re.compile(r'[A-Z0-9]+', re.IGNORECASE),
+            'study_id': re.compile(r'[A-Z0-9]+', re.IGNORECASE),
+            'acquisition_date': re.compile(r'\d{1,2}\/\d{1,2}\/\d{4}')
+        }
+    
     def parse_medical_fields(self, text: str) -> MedicalReportData:
         """
         Parse medical fields from extracted text
@@ -115,31 +178,88 @@ class FieldParser:
         """
         logger.info("Parsing medical fields from extracted text")
         
+        values = {field_name: self._extract_field(field_name, text) for field_name in self.patterns}
+        return self._build_report(values)
+    
+    def parse_from_words(self, words: List[WordBox]) -> MedicalReportData:
+        """
+        Parse medical fields from OCR word boxes by spatial adjacency
+        
+        Each label token found through the label index is paired with the
+        words to its right on the same line, or failing that with the words
+        directly below it, stopping at the next label. This keeps the two
+        columns of the report header apart without any full-text regex scan.
+        
+        Args:
+            words: Word boxes from OCRService.extract_words
+            
+        Returns:
+            MedicalReportData: Structured medical report data
+        """
+        logger.info(f"Parsing medical fields from {len(words)} word boxes")
+        
+        lines = self._group_lines(words)
+        labels = self._find_labels(lines)
+        label_spans = {(line_idx, word_idx)
+                       for line_idx, start, end, _ in labels
+                       for word_idx in range(start, end)}
+        
+        values: Dict[str, Optional[str]] = {}
+        for line_idx, start, end, field_name in labels:
+            if values.get(field_name):
+                continue
+            
+            tokens = self._value_right(lines, line_idx, end, label_spans)
+            if not tokens:
+                tokens = self._value_below(lines, line_idx, start, end, label_spans)
+            values[field_name] = self._clean_value(field_name, ' '.join(tokens))
+        
+        # Patient IDs are frequently printed without a usable label, so fall
+        # back to checking individual tokens against the ID format
+        if not values.get('patient_id'):
+            id_pattern = self.value_patterns['patient_id']
+            values['patient_id'] = next(
+                (word.text for line in lines for word in line if id_pattern.fullmatch(word.text)),
+                None
+            )
+        
+        return self._build_report(values)
+    
+    def _build_report(self, values: Dict[str, Optional[str]]) -> MedicalReportData:
+        """
+        Assemble report model from extracted field values
+        
+        Args:
+            values: Extracted values keyed by field name
+            
+        Returns:
+            MedicalReportData: Structured medical report data
+        """
         # Extract patient information
         patient_info = PatientInfo(
-            name=self._extract_field('patient_name', text),
-            id=self._extract_field('patient_id', text),
-            sex=self._extract_field('sex', text),
-            birthdate_age=self._extract_field('birthdate_age', text),
-            accession_number=self._extract_field('accession_number', text),
-            referring_physician=self._extract_field('referring_physician', text),
-            study_id=self._extract_field('study_id', text),
-            height=self._extract_field('height', text),
-            weight=self._extract_field('weight', text),
-            bsa=self._extract_field('bsa', text),
-            acquisition_date=self._extract_field('acquisition_date', text),
-            comments=self._extract_field('comments', text)
+            name=values.get('patient_name'),
+            id=values.get('patient_id'),
+            sex=values.get('sex'),
+            birthdate_age=values.get('birthdate_age'),
+            accession_number=values.get('accession_number'),
+            referring_physician=values.get('referring_physician'),
+            study_id=values.get('study_id'),
+            height=values.get('height'),
+            weight=values.get('weight'),
+            bsa=values.get('bsa'),
+            acquisition_date=values.get('acquisition_date'),
+            comments=values.get('comments')
         )
         
         # Extract report details
         report_details = ReportDetails(
-            user_name=self._extract_field('user_name', text),
-            created_on=self._extract_field('created_on', text),
-            license_id=self._extract_field('license_id', text),
-            physician=self._extract_field('physician', text),
-            institution_name=self._extract_field('institution_name', text),
-            institution_address=self._extract_field('institution_address', text),
-            department_name=self._extract_field('department_name', text)
+            user_name=values.get('user_name'),
+            created_on=values.get('created_on'),
+            license_id=values.get('license_id'),
+            physician=values.get('physician'),
+            institution_name=values.get('institution_name'),
+            institution_address=values.get('institution_address'),
+            department_name=values.get('department_name')
         )
         
         # Create medical report data
@@ -154,6 +274,174 @@ class FieldParser:
         
         return medical_data
     
+    def _group_lines(self, words: List[WordBox]) -> List[List[WordBox]]:
+        """
+        Group word boxes into text lines ordered top to bottom
+        
+        Args:
+            words: Word boxes from Tesseract
+            
+        Returns:
+            List[List[WordBox]]: Lines of words, each sorted left to right
+        """
+        grouped: Dict[Tuple[int, int, int, int], List[WordBox]] = {}
+        for word in words:
+            grouped.setdefault((word.page, word.block, word.par, word.line), []).append(word)
+        
+        lines = [sorted(line, key=lambda w: w.left) for line in grouped.values()]
+        lines.sort(key=lambda line: (line[0].page, min(w.top for w in line)))
+        return lines
+    
+    def _find_labels(self, lines: List[List[WordBox]]) -> List[Tuple[int, int, int, str]]:
+        """
+        Locate label tokens through the label index
+        
+        Labels split over several tokens ("Accession number") are matched
+        by joining up to MAX_LABEL_TOKENS neighbours, longest match first.
+        
+        Args:
+            lines: Lines of words from _group_lines
+            
+        Returns:
+            List[Tuple[int, int, int, str]]: (line index, first word, end word, field name)
+        """
+        labels = []
+        for line_idx, line in enumerate(lines):
+            word_idx = 0
+            while word_idx < len(line):
+                for size in range(min(MAX_LABEL_TOKENS, len(line) - word_idx), 0, -1):
+                    parts = [self._normalize_label(w.text) for w in line[word_idx:word_idx + size]]
+                    # Punctuation-only tokens are values (".", "-"), never part of a label
+                    field_name = self.label_index.get(''.join(parts)) if all(parts) else None
+                    if field_name:
+                        labels.append((line_idx, word_idx, word_idx + size, field_name))
+                        word_idx += size
+                        break
+                else:
+                    word_idx += 1
+        
+        return labels
+    
+    def _value_right(self, lines: List[List[WordBox]], line_idx: int, end: int,
+                     label_spans: set) -> List[str]:
+        """
+        Collect value words to the right of a label on the same line
+        
+        Args:
+            lines: Lines of words
+            line_idx: Line holding the label
+            end: Index just past the label's last word
+            label_spans: (line, word) positions that belong to labels
+            
+        Returns:
+            List[str]: Value tokens, possibly empty
+        """
+        tokens = []
+        for word_idx in range(end, len(lines[line_idx])):
+            if (line_idx, word_idx) in label_spans:
+                break
+            tokens.append(lines[line_idx][word_idx].text)
+        return tokens
+    
+    def _value_below(self, lines: List[List[WordBox]], line_idx: int, start: int, end: int,
+                     label_spans: set) -> List[str]:
+        """
+        Collect value words directly below a label
+        
+        The label's column runs from its left edge to the next label on
+        its line (or the end of the line). The line below is the nearest
+        one starting under the label that has words in that column, not
+        simply the next line in reading order, which in a two-column header
+        is often the other column's line at about the same height. Its
+        words inside the column are taken until the next label.
+        
+        Args:
+            lines: Lines of words
+            line_idx: Line holding the label
+            start: Index of the label's first word
+            end: Index just past the label's last word
+            label_spans: (line, word) positions that belong to labels
+            
+        Returns:
+            List[str]: Value tokens, possibly empty
+        """
+        line = lines[line_idx]
+        line_height = max(w.height for w in line[start:end])
+        label_bottom = max(w.bottom for w in line[start:end])
+        
+        column_left = line[start].left
+        column_right = next(
+            (line[i].left for i in range(end, len(line)) if (line_idx, i) in label_spans),
+            float('inf')
+        )
+        
+        # Lines are sorted by top edge, so the first match is the nearest one
+        below_idx = None
+        for idx in range(line_idx + 1, len(lines)):
+            candidate = lines[idx]
+            top = min(w.top for w in candidate)
+            if candidate[0].page != line[0].page or top - label_bottom > 1.5 * line_height:
+                break
+            # Allow a little overlap, as OCR boxes of adjacent lines often touch
+            if top < label_bottom - 0.25 * line_height:
+                continue
+            if any(w.right > column_left and w.left < column_right for w in candidate):
+                below_idx = idx
+                break
+        
+        if below_idx is None:
+            return []
+        
+        tokens = []
+        for word_idx, word in enumerate(lines[below_idx]):
+            if word.right <= column_left:
+                continue
+            if word.left >= column_right or (below_idx, word_idx) in label_spans:
+                break
+            tokens.append(word.text)
+        return tokens
+    
+    def _normalize_label(self, text: str) -> str:
+        """
+        Normalize a token for label lookup
+        
+        Args:
+            text: Raw OCR token
+            
+        Returns:
+            str: Lowercase token with non-alphanumerics removed
+        """
+        return re.sub(r'[^a-z0-9]', '', text.lower())
+    
+    def _clean_value(self, field_name: str, value: str) -> Optional[str]:
+        """
+        Clean a value found next to a label
+        
+        Strictly formatted fields must start with their value pattern,
+        which also trims trailing noise picked up from the same line.
+        
+        Args:
+            field_name: Name of the field the value belongs to
+            value: Raw value text
+            
+        Returns:
+            Optional[str]: Cleaned value or None
+        """
+        value = re.sub(r'\s+', ' ', value).strip()
+        
+        pattern = self.value_patterns.get(field_name)
+        if pattern:
+            match = pattern.match(value)
+            if not match:
+                return None
+            value = match.group(0)
+        
+        value = value.strip('.,:-')
+        if value and len(value) > 1:
+            return value
+        
+        return None
+    
     def _extract_field(self, field_name: str, text: str) -> Optional[str]:
         """
         Extract a specific field from text using regex pattern
@@ -0,0 +1,454 @@
+"""
+Load-testing harness for the Medical Report OCR Extractor API.
+
+Drives the upload endpoints with a weighted mix of sample files, either
+in-process through the ASGI app or over HTTP against a running server, and
+writes a machine-readable JSON report.
+
+Examples:
+    # Closed-loop concurrency sweep against the in-process app
+    python loadtest.py --sample report.pdf:3 --sample scan.jpg --concurrency 1,2,4,8
+
+    # Open-loop arrival-rate sweep against a local server
+    python loadtest.py --url http://localhost:8000 --sample report.pdf --rates 0.5,1,2,4
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import mimetypes
+import os
+import random
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class Sample:
+    """Sample upload held in memory so file I/O does not skew latency"""
+
+    def __init__(self, path: str, weight: float = 1.0):
+        """
+        Load sample file contents
+
+        Args:
+            path: Path to the sample file
+            weight: Relative frequency of this sample in the request mix
+        """
+        self.path = path
+        self.weight = weight
+        self.filename = os.path.basename(path)
+        self.content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        with open(path, 'rb') as f:
+            self.content = f.read()
+
+
+class RequestMix:
+    """Weighted mix of samples and endpoints to draw requests from"""
+
+    def __init__(self, samples: List[Sample], endpoints: List[Tuple[str, float]], seed: Optional[int] = None):
+        """
+        Initialize request mix
+
+        Args:
+            samples: Sample uploads to choose from
+            endpoints: (path, weight) pairs of endpoints to target
+            seed: Optional random seed for reproducible runs
+        """
+        if not samples:
+            raise ValueError("At least one sample file is required")
+        if not endpoints:
+            raise ValueError("At least one endpoint is required")
+
+        self.samples = samples
+        self.endpoints = endpoints
+        self._random = random.Random(seed)
+
+    def next(self) -> Tuple[str, Sample]:
+        """
+        Draw the next request
+
+        Returns:
+            Tuple[str, Sample]: Endpoint path and sample to upload
+        """
+        endpoint = self._random.choices(
+            [path for path, _ in self.endpoints],
+            weights=[weight for _, weight in self.endpoints]
+        )[0]
+        sample = self._random.choices(self.samples, weights=[s.weight for s in self.samples])[0]
+        return endpoint, sample
+
+    def interarrival(self, rate: float) -> float:
+        """
+        Draw an exponential inter-arrival gap for a Poisson process
+
+        Args:
+            rate: Arrival rate in requests per second
+
+        Returns:
+            float: Seconds until the next arrival
+        """
+        return self._random.expovariate(rate)
+
+
+class StepRecorder:
+    """Collects outcomes for one load level"""
+
+    def __init__(self):
+        """Initialize empty recorder"""
+        self.latencies: List[float] = []
+        self.status_counts: Dict[str, int] = {}
+        self.errors = 0
+        self.dropped = 0
+
+    def record(self, status: str, latency: float, ok: bool) -> None:
+        """
+        Record a finished request
+
+        Args:
+            status: HTTP status code or exception name
+            latency: Request latency in seconds
+            ok: Whether the request counts as successful
+        """
+        self.status_counts[status] = self.status_counts.get(status, 0) + 1
+        if ok:
+            self.latencies.append(latency)
+        else:
+            self.errors += 1
+
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    """
+    Nearest-rank percentile of an already sorted list
+
+    Args:
+        sorted_values: Values in ascending order
+        pct: Percentile between 0 and 100
+
+    Returns:
+        Optional[float]: Percentile value or None for an empty list
+    """
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def find_knee(levels: List[float], throughputs: List[float]) -> Optional[int]:
+    """
+    Locate the knee of a throughput curve
+
+    Uses the Kneedle approach: both axes are normalized to [0, 1] and the
+    knee is the point furthest above the straight line between the ends.
+    Points past the throughput peak are ignored so a collapsing tail cannot
+    pull the knee to the right.
+
+    Args:
+        levels: Offered load levels in ascending order
+        throughputs: Measured throughput for each level
+
+    Returns:
+        Optional[int]: Index of the knee point or None without data
+    """
+    if not levels:
+        return None
+
+    peak = max(range(len(throughputs)), key=lambda i: throughputs[i])
+    if peak < 2:
+        return peak
+
+    xs = levels[:peak + 1]
+    ys = throughputs[:peak + 1]
+    x_span = (xs[-1] - xs[0]) or 1.0
+    y_span = (ys[-1] - ys[0]) or 1.0
+
+    best_index, best_distance = peak, 0.0
+    for i, (x, y) in enumerate(zip(xs, ys)):
+        distance = (y - ys[0]) / y_span - (x - xs[0]) / x_span
+        if distance > best_distance:
+            best_index, best_distance = i, distance
+
+    return best_index
+
+
+class LoadTester:
+    """Async load generator for the extraction endpoints"""
+
+    def __init__(self, client: httpx.AsyncClient, mix: RequestMix, timeout: float = 120.0):
+        """
+        Initialize load tester
+
+        Args:
+            client: HTTP client bound to the target app or server
+            mix: Request mix to draw uploads from
+            timeout: Per-request timeout in seconds
+        """
+        self.client = client
+        self.mix = mix
+        self.timeout = timeout
+
+    async def _send(self, recorder: StepRecorder) -> None:
+        """Send one request drawn from the mix and record its outcome"""
+        endpoint, sample = self.mix.next()
+        files = {'file': (sample.filename, sample.content, sample.content_type)}
+
+        start = time.perf_counter()
+        try:
+            response = await self.client.post(endpoint, files=files, timeout=self.timeout)
+            latency = time.perf_counter() - start
+            recorder.record(str(response.status_code), latency, response.status_code < 400)
+        except Exception as e:
+            latency = time.perf_counter() - start
+            recorder.record(type(e).__name__, latency, False)
+
+    async def run_closed_loop(self, concurrency: int, duration: float, warmup: float = 0.0) -> dict:
+        """
+        Run a fixed number of clients back-to-back for a duration
+
+        Args:
+            concurrency: Number of concurrent clients
+            duration: Measurement window in seconds
+            warmup: Seconds to run before measuring
+
+        Returns:
+            dict: Step summary
+        """
+        if warmup > 0:
+            await self._closed_loop(concurrency, warmup, StepRecorder())
+
+        recorder = StepRecorder()
+        elapsed = await self._closed_loop(concurrency, duration, recorder)
+        return self._summarize('concurrency', concurrency, recorder, elapsed)
+
+    async def _closed_loop(self, concurrency: int, duration: float, recorder: StepRecorder) -> float:
+        """Drive closed-loop clients until the window ends and all requests finish"""
+        start = time.perf_counter()
+        stop_at = start + duration
+
+        async def client_loop():
+            while time.perf_counter() < stop_at:
+                await self._send(recorder)
+
+        await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+        return time.perf_counter() - start
+
+    async def run_open_loop(self, rate: float, duration: float, max_outstanding: int = 1000) -> dict:
+        """
+        Issue requests on a Poisson schedule regardless of completions
+
+        Arrivals that find max_outstanding requests already in flight are
+        dropped and counted as errors, so an overloaded target shows up in
+        the report instead of exhausting the generator.
+
+        Args:
+            rate: Arrival rate in requests per second
+            duration: Arrival window in seconds
+            max_outstanding: Cap on concurrently outstanding requests
+
+        Returns:
+            dict: Step summary
+        """
+        recorder = StepRecorder()
+        in_flight = set()
+
+        start = time.perf_counter()
+        next_arrival = start
+        stop_at = start + duration
+        while True:
+            next_arrival += self.mix.interarrival(rate)
+            if next_arrival >= stop_at:
+                break
+            delay = next_arrival - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            if len(in_flight) >= max_outstanding:
+                recorder.dropped += 1
+                recorder.record('dropped', 0.0, False)
+                continue
+
+            task = asyncio.ensure_future(self._send(recorder))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+
+        if in_flight:
+            await asyncio.gather(*in_flight)
+        elapsed = time.perf_counter() - start
+        return self._summarize('rate', rate, recorder, elapsed)
+
+    def _summarize(self, mode: str, level: float, recorder: StepRecorder, elapsed: float) -> dict:
+        """Build the report entry for one load level"""
+        latencies = sorted(recorder.latencies)
+        total = len(latencies) + recorder.errors
+
+        def ms(value: Optional[float]) -> Optional[float]:
+            return round(value * 1000, 2) if value is not None else None
+
+        summary = {
+            'mode': mode,
+            'level': level,
+            'duration_s': round(elapsed, 3),
+            'requests': total,
+            'succeeded': len(latencies),
+            'errors': recorder.errors,
+            'dropped': recorder.dropped,
+            'error_rate': round(recorder.errors / total, 4) if total else 0.0,
+            'throughput_rps': round(len(latencies) / elapsed, 3) if elapsed > 0 else 0.0,
+            'status_counts': recorder.status_counts,
+            'latency_ms': {
+                'p50': ms(percentile(latencies, 50)),
+                'p95': ms(percentile(latencies, 95)),
+                'p99': ms(percentile(latencies, 99)),
+                'mean': ms(sum(latencies) / len(latencies)) if latencies else None,
+                'max': ms(latencies[-1]) if latencies else None,
+            }
+        }
+
+        logger.info(
+            f"{mode}={level}: {summary['throughput_rps']} req/s, "
+            f"p99={summary['latency_ms']['p99']} ms, error_rate={summary['error_rate']}"
+        )
+        return summary
+
+
+def _parse_weighted(value: str) -> Tuple[str, float]:
+    """Parse a 'NAME[:WEIGHT]' command-line value"""
+    name, sep, weight = value.rpartition(':')
+    if sep and name:
+        try:
+            return name, float(weight)
+        except ValueError:
+            pass
+    return value, 1.0
+
+
+def _parse_levels(value: str) -> List[float]:
+    """Parse a comma-separated list of load levels"""
+    return [float(level) for level in value.split(',') if level.strip()]
+
+
+def build_client(url: Optional[str], keep_caches: bool = False) -> httpx.AsyncClient:
+    """
+    Create an HTTP client for the target
+
+    Samples are sent over and over, so in-process the page cache and request
+    coalescing are turned off unless keep_caches is set; otherwise the sweep
+    measures cache hits rather than OCR.
+
+    Args:
+        url: Base URL of a running server, or None to drive the app in-process
+        keep_caches: Keep the page cache and coalescing of the in-process app
+
+    Returns:
+        httpx.AsyncClient: Configured client
+    """
+    if url:
+        return httpx.AsyncClient(base_url=url)
+
+    if not keep_caches:
+        os.environ['PAGE_CACHE_SIZE'] = '0'
+        os.environ['OCR_COALESCE'] = '0'
+
+    from main import app
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://loadtest')
+
+
+async def run(args: argparse.Namespace) -> dict:
+    """
+    Run the configured sweeps and build the report
+
+    Args:
+        args: Parsed command-line arguments
+
+    Returns:
+        dict: Load test report
+    """
+    samples = [Sample(path, weight) for path, weight in map(_parse_weighted, args.sample)]
+    endpoints = [_parse_weighted(endpoint) for endpoint in (args.endpoint or ['/extract'])]
+    mix = RequestMix(samples, endpoints, seed=args.seed)
+
+    report = {
+        'target': args.url or 'in-process',
+        'started_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'samples': [{'file': s.filename, 'bytes': len(s.content), 'weight': s.weight} for s in samples],
+        'endpoints': [{'path': path, 'weight': weight} for path, weight in endpoints],
+        'sweeps': {}
+    }
+
+    async with build_client(args.url, args.keep_caches) as client:
+        tester = LoadTester(client, mix, timeout=args.timeout)
+
+        if args.concurrency:
+            steps = []
+            for level in _parse_levels(args.concurrency):
+                steps.append(await tester.run_closed_loop(int(level), args.duration, args.warmup))
+            report['sweeps']['concurrency'] = _with_knee(steps)
+
+        if args.rates:
+            steps = []
+            for level in _parse_levels(args.rates):
+                steps.append(await tester.run_open_loop(level, args.duration, args.max_outstanding))
+            report['sweeps']['rate'] = _with_knee(steps)
+
+    return report
+
+
+def _with_knee(steps: List[dict]) -> dict:
+    """Attach the knee of the throughput curve to a sweep"""
+    knee = find_knee([s['level'] for s in steps], [s['throughput_rps'] for s in steps])
+    return {
+        'steps': steps,
+        'knee': {
+            'level': steps[knee]['level'],
+            'throughput_rps': steps[knee]['throughput_rps'],
+            'p99_ms': steps[knee]['latency_ms']['p99']
+        } if knee is not None else None
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description="Load-test the Medical Report OCR Extractor API")
+    parser.add_argument('--url', help="Base URL of a running server (default: drive the app in-process)")
+    parser.add_argument('--sample', action='append', required=True,
+                        help="Sample file to upload, optionally weighted as PATH:WEIGHT (repeatable)")
+    parser.add_argument('--endpoint', action='append',
+                        help="Endpoint to target, optionally weighted as PATH:WEIGHT (default: /extract)")
+    parser.add_argument('--concurrency', help="Comma-separated closed-loop concurrency levels, e.g. 1,2,4,8")
+    parser.add_argument('--rates', help="Comma-separated open-loop arrival rates in req/s, e.g. 0.5,1,2")
+    parser.add_argument('--duration', type=float, default=30.0, help="Seconds per load level (default: 30)")
+    parser.add_argument('--warmup', type=float, default=0.0, help="Warm-up seconds before each closed-loop level")
+    parser.add_argument('--timeout', type=float, default=120.0, help="Per-request timeout in seconds")
+    parser.add_argument('--max-outstanding', type=int, default=1000,
+                        help="Open-loop cap on in-flight requests before arrivals are dropped")
+    parser.add_argument('--seed', type=int, help="Random seed for a reproducible request mix")
+    parser.add_argument('--keep-caches', action='store_true',
+                        help="Keep the page cache and request coalescing of the in-process app")
+    parser.add_argument('--output', help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    if not args.concurrency and not args.rates:
+        parser.error("specify --concurrency and/or --rates")
+
+    logging.basicConfig(level=logging.INFO)
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+    report = asyncio.run(run(args))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Report written to {args.output}")
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
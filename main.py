@@ -142,148 +142,440 @@
 #     )
 
 
+import asyncio
 import os
+import secrets
 import tempfile
+import time
 import json
+from contextlib import asynccontextmanager
 from typing import List, Optional
-from fastapi import FastAPI, File, UploadFile, HTTPException
+import anyio
+from fastapi import Depends, FastAPI, File, Header, UploadFile, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
 from fastapi.encoders import jsonable_encoder
 import uvicorn
+import aiofiles
 import logging
 
 from models import MedicalReportData, MedicalReportDataDetailed, ErrorResponse
-from ocr_service import OCRService
+from ocr_service import OCRService, CancellationToken
+from page_cache import PageCache
+from single_flight import SingleFlight
+from extraction import ExtractionError, extract_report
+from broker import DONE, FAILED, create_broker
+from autotune import DEFAULT_TOPOLOGY_FILE, DEFAULT_TRIAL_SECONDS, apply_topology, calibrate, load_topology, save_topology
 from field_parser import FieldParser
-from utils import validate_file, save_uploaded_file, format_medical_response
+from utils import validate_file, save_uploaded_file
 from fastapi.middleware.cors import CORSMiddleware
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Calibrate in the background at startup if OCR_CALIBRATE asks for it"""
+    if CALIBRATE_ON_STARTUP == "startup" or (CALIBRATE_ON_STARTUP == "missing" and topology is None):
+        start_calibration(DEFAULT_TRIAL_SECONDS)
+    yield
+
 app = FastAPI(
-title="Medical Report OCR Extractor",
-description="A FastAPI service that extracts structured medical data from PDF and image reports using Tesseract OCR",
-version="1.0.0"
+    title="Medical Report OCR Extractor",
+    description="A FastAPI service that extracts structured medical data from PDF and image reports using Tesseract OCR",
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 app.add_middleware(
-CORSMiddleware,
-allow_origins=["*"], # <-- 🔥 You can specify origins later
-allow_credentials=True,
-allow_methods=["*"],
-allow_headers=["*"],
+    CORSMiddleware,
+    allow_origins=["*"], # <-- 🔥 You can specify origins later
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
 )
 
 # Initialize services
-ocr_service = OCRService()
+# Pages repeated across reports (disclaimers, legends, blank forms) are
+# cached by content; PAGE_CACHE_SIZE=0 disables the cache
+page_cache = PageCache(max_entries=int(os.environ.get("PAGE_CACHE_SIZE", "512")))
+ocr_service = OCRService(page_cache=page_cache)
 field_parser = FieldParser()
 
+# Concurrent documents, parallel pages and Tesseract threads for this machine,
+# as chosen by calibration (autotune.py). OCR_CALIBRATE=startup recalibrates
+# when the app starts, OCR_CALIBRATE=missing only if nothing was saved yet
+TOPOLOGY_FILE = os.environ.get("OCR_TOPOLOGY_FILE", DEFAULT_TOPOLOGY_FILE)
+CALIBRATE_ON_STARTUP = os.environ.get("OCR_CALIBRATE", "")
+
+# Concurrent inline OCR requests without a saved topology (anyio's default thread limit)
+DEFAULT_OCR_WORKERS = 40
+
+topology = load_topology(TOPOLOGY_FILE)
+if topology is not None:
+    apply_topology(ocr_service, topology)
+ocr_limiter = anyio.CapacityLimiter(topology.workers if topology is not None else DEFAULT_OCR_WORKERS)
+
+# Admin endpoints require this token in the X-Admin-Token header and are
+# disabled while it is unset
+ADMIN_TOKEN = os.environ.get("OCR_ADMIN_TOKEN")
+
+calibration = {"status": "idle", "started_at": None, "error": None, "trials": []}
+calibration_task: Optional[asyncio.Task] = None
+
+# Concurrent uploads of identical bytes share one OCR run; OCR_COALESCE=0
+# turns this off, e.g. for load tests that resend the same samples
+COALESCE_REQUESTS = os.environ.get("OCR_COALESCE", "1") != "0"
+single_flight = SingleFlight()
+
+# With OCR_BROKER_URL set (e.g. sqlite:////var/lib/ocr/queue.db), OCR is handed
+# to worker.py processes through the broker instead of running inline
+BROKER_URL = os.environ.get("OCR_BROKER_URL")
+broker = create_broker(BROKER_URL) if BROKER_URL else None
+
+# How often a brokered request checks for its result, and how long past the
+# deadline it waits for a worker to store a partial result
+BROKER_POLL_SECONDS = 0.2
+BROKER_GRACE_SECONDS = 5.0
+
 # File size limit (10MB)
 MAX_FILE_SIZE = 10 * 1024 * 1024
-ALLOWED_EXTENSIONS = {'.pdf', '.png', '.jpg', '.jpeg'}
+ALLOWED_EXTENSIONS = {'.pdf', '.png', '.jpg', '.jpeg', '.tif', '.tiff'}
+
+# Field extraction modes: "text" runs regexes over the flattened OCR text,
+# "layout" pairs labels and values using Tesseract's word boxes
+EXTRACTION_MODES = {'text', 'layout'}
+DEFAULT_EXTRACTION_MODE = os.environ.get("EXTRACTION_MODE", "text")
+
+# Per-request processing time budget in seconds; requests may ask for a
+# different budget up to the maximum
+DEFAULT_DEADLINE_SECONDS = float(os.environ.get("OCR_DEADLINE_SECONDS", "60"))
+MAX_DEADLINE_SECONDS = float(os.environ.get("OCR_MAX_DEADLINE_SECONDS", "300"))
+
+# How often an in-flight request checks whether its client went away
+DISCONNECT_POLL_SECONDS = 0.5
+
+async def _wait_for_disconnect(request: Request) -> None:
+    """Return once the client disconnects"""
+    while not await request.is_disconnected():
+        await asyncio.sleep(DISCONNECT_POLL_SECONDS)
+
+async def run_until_disconnected(request: Request, awaitable):
+    """
+    Await work on behalf of a request, abandoning it if the client disconnects
+
+    Args:
+        request: Incoming request to watch
+        awaitable: Work to await
+
+    Returns:
+        Result of the work
+
+    Raises:
+        HTTPException: 499 if the client disconnected first
+    """
+    work = asyncio.ensure_future(awaitable)
+    watcher = asyncio.ensure_future(_wait_for_disconnect(request))
+    try:
+        await asyncio.wait({work, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    except BaseException:
+        work.cancel()
+        raise
+    finally:
+        watcher.cancel()
+
+    if not work.done():
+        logger.info("Client disconnected, abandoning OCR work")
+        work.cancel()
+        raise HTTPException(status_code=499, detail="Client closed request")
+    return work.result()
+
+async def process_upload(file_path: str, filename: str, mode: str, deadline: float) -> dict:
+    """
+    Run OCR and field parsing on a saved upload
+
+    Runs as the shared task for all coalesced requests. Work is done inline
+    in the threadpool, or by a worker when a broker is configured; either
+    way, cancelling the task stops it.
+
+    Args:
+        file_path: Path of the saved upload
+        filename: Original filename, for logging
+        mode: Extraction mode
+        deadline: Processing time budget in seconds
+
+    Returns:
+        dict: Formatted response content
+    """
+    if broker is not None:
+        return await dispatch_to_broker(file_path, filename, mode, deadline)
+
+    token = CancellationToken(deadline)
+    try:
+        # Requests beyond the calibrated number of workers wait here, using up their deadline
+        return await anyio.to_thread.run_sync(
+            extract_report, ocr_service, field_parser, file_path, filename, mode, token,
+            limiter=ocr_limiter
+        )
+    except ExtractionError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    finally:
+        # Stop the worker thread if this task was cancelled
+        token.cancel()
+
+async def dispatch_to_broker(file_path: str, filename: str, mode: str, deadline: float) -> dict:
+    """
+    Queue an upload for the worker fleet and wait for its result
+
+    Args:
+        file_path: Path of the saved upload
+        filename: Original filename
+        mode: Extraction mode
+        deadline: Processing time budget in seconds, including time spent queued
+
+    Returns:
+        dict: Formatted response content from the worker
+    """
+    async with aiofiles.open(file_path, 'rb') as f:
+        payload = await f.read()
+
+    deadline_at = time.time() + deadline
+    task_id = await run_in_threadpool(broker.enqueue, payload, filename, {'mode': mode, 'deadline_at': deadline_at})
+    try:
+        while True:
+            status = await run_in_threadpool(broker.get_status, task_id)
+            if status is None:
+                raise HTTPException(status_code=500, detail="OCR task disappeared from the broker")
+            if status['status'] == DONE:
+                return status['result']
+            if status['status'] == FAILED:
+                raise HTTPException(
+                    status_code=status['status_code'] or 500,
+                    detail=status['error'] or "OCR task failed"
+                )
+            if time.time() > deadline_at + BROKER_GRACE_SECONDS:
+                raise HTTPException(
+                    status_code=504,
+                    detail="Processing deadline exceeded while waiting for an OCR worker"
+                )
+            await asyncio.sleep(BROKER_POLL_SECONDS)
+    finally:
+        # Deleting the task also stops a worker still processing it, at its next heartbeat
+        await run_in_threadpool(broker.delete, task_id)
+
+async def run_calibration(trial_seconds: float) -> None:
+    """
+    Calibrate the OCR topology, then save and apply the result
+
+    Args:
+        trial_seconds: Seconds to measure each candidate topology for
+    """
+    global topology
+
+    try:
+        new_topology, trials = await run_in_threadpool(calibrate, trial_seconds)
+        await run_in_threadpool(save_topology, new_topology, TOPOLOGY_FILE)
+    except Exception as e:
+        logger.error(f"OCR topology calibration failed: {str(e)}")
+        calibration.update(status="failed", error=str(e))
+        return
+
+    apply_topology(ocr_service, new_topology)
+    ocr_limiter.total_tokens = new_topology.workers
+    topology = new_topology
+    calibration.update(status="done", trials=trials)
+
+def start_calibration(trial_seconds: float) -> bool:
+    """
+    Start calibrating in the background unless a calibration is already running
+
+    Args:
+        trial_seconds: Seconds to measure each candidate topology for
+
+    Returns:
+        bool: Whether a calibration was started
+    """
+    global calibration_task
+
+    if calibration_task is not None and not calibration_task.done():
+        return False
+
+    calibration.update(status="running", started_at=time.time(), error=None)
+    calibration_task = asyncio.ensure_future(run_calibration(trial_seconds))
+    return True
+
+async def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    """
+    Reject admin requests without the configured admin token
+
+    Raises:
+        HTTPException: 403 if no admin token is configured, 401 if the header is missing or wrong
+    """
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled; set OCR_ADMIN_TOKEN to enable them")
+    if x_admin_token is None or not secrets.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Missing or invalid admin token")
+
+def remove_temp_file(file_path: str) -> None:
+    """Delete a temporary upload if it still exists"""
+    if os.path.exists(file_path):
+        os.unlink(file_path)
 
 @app.get("/")
 async def root():
-"""Root endpoint with API information"""
-return {
-"message": "Medical Report OCR Extractor API",
-"version": "1.0.0",
-"endpoints": {
-"upload": "/extract",
-"health": "/health",
-"docs": "/docs"
-}
-}
+    """Root endpoint with API information"""
+    return {
+        "message": "Medical Report OCR Extractor API",
+        "version": "1.0.0",
+        "endpoints": {
+            "upload": "/extract",
+            "health": "/health",
+            "metrics": "/metrics",
+            "topology": "/admin/topology",
+            "docs": "/docs"
+        }
+    }
 
 @app.get("/health")
 async def health_check():
-"""Health check endpoint"""
-return {"status": "healthy", "service": "Medical Report OCR Extractor"}
+    """Health check endpoint"""
+    return {"status": "healthy", "service": "Medical Report OCR Extractor"}
+
+@app.get("/metrics")
+async def metrics():
+    """Processing metrics endpoint"""
+    return {
+        "page_cache": page_cache.stats(),
+        "coalescing": single_flight.stats(),
+        "broker": await run_in_threadpool(broker.stats) if broker is not None else None
+    }
+
+@app.get("/admin/topology", dependencies=[Depends(require_admin)])
+async def get_topology():
+    """Chosen OCR topology, the settings in effect and the last calibration"""
+    return {
+        "topology": topology._asdict() if topology is not None else None,
+        "topology_file": TOPOLOGY_FILE,
+        "effective": {
+            "workers": int(ocr_limiter.total_tokens),
+            "page_workers": ocr_service.page_workers,
+            "tesseract_threads": ocr_service.tesseract_threads
+        },
+        "calibration": calibration
+    }
+
+@app.post("/admin/calibrate", status_code=202, dependencies=[Depends(require_admin)])
+async def start_topology_calibration(
+    trial_seconds: float = Query(DEFAULT_TRIAL_SECONDS, gt=0, le=120, description="Seconds to measure each candidate for")
+):
+    """
+    Recalibrate the OCR topology in the background
+
+    Throughput is measured on this machine while it keeps serving, so run it
+    when traffic is low. Poll GET /admin/topology for the result.
+    """
+    if not start_calibration(trial_seconds):
+        raise HTTPException(status_code=409, detail="A calibration is already running")
+    return {"status": "running", "trial_seconds": trial_seconds}
 
 @app.post("/extract", response_model=MedicalReportData)
-async def extract_medical_data(file: UploadFile = File(...)):
-"""
-Extract structured medical data from uploaded PDF or image file
-
-Args:
-file: Uploaded file (PDF, PNG, JPG, JPEG)
-
-Returns:
-MedicalReportData: Structured medical report data
-"""
-try:
-# Validate file
-validation_error = validate_file(file, MAX_FILE_SIZE, ALLOWED_EXTENSIONS)
-if validation_error:
-raise HTTPException(status_code=400, detail=validation_error)
-
-logger.info(f"Processing file: {file.filename}")
-
-# Save uploaded file temporarily
-filename = file.filename or "unknown"
-file_ext = os.path.splitext(filename)[1]
-with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as temp_file:
-temp_file_path = temp_file.name
-await save_uploaded_file(file, temp_file_path)
-
-try:
-# Extract text using OCR
-extracted_text = ocr_service.extract_text(temp_file_path)
-
-if not extracted_text.strip():
-raise HTTPException(
-status_code=422,
-detail="No text could be extracted from the uploaded file. Please ensure the file contains readable text."
-)
-
-logger.info(f"Extracted text length: {len(extracted_text)} characters")
-
-# Parse medical fields from extracted text
-medical_data = field_parser.parse_medical_fields(extracted_text)
-
-logger.info(f"Successfully processed file: {filename}")
-
-# Format response using utility function for better readability
-formatted_response = format_medical_response(medical_data)
-
-# Return with formatted JSON and proper content type
-return JSONResponse(
-content=formatted_response,
-status_code=200,
-headers={"Content-Type": "application/json; charset=utf-8"}
-)
-
-finally:
-# Clean up temporary file
-if os.path.exists(temp_file_path):
-os.unlink(temp_file_path)
-
-except HTTPException:
-raise
-except Exception as e:
-logger.error(f"Error processing file {file.filename}: {str(e)}")
-raise HTTPException(
-status_code=500,
-detail=f"Internal server error while processing file: {str(e)}"
-)
+async def extract_medical_data(
+    request: Request,
+    file: UploadFile = File(...),
+    mode: Optional[str] = Query(None, description="Extraction mode: 'text' or 'layout'"),
+    timeout: Optional[float] = Query(None, gt=0, description="Processing time budget in seconds")
+):
+    """
+    Extract structured medical data from uploaded PDF or image file
+
+    Args:
+        file: Uploaded file (PDF, PNG, JPG, JPEG, TIFF)
+        mode: Extraction mode, defaults to the EXTRACTION_MODE setting
+        timeout: Time budget in seconds, defaults to OCR_DEADLINE_SECONDS
+
+    Returns:
+        MedicalReportData: Structured medical report data, with "partial": true
+        and "pages_completed" when the time budget ran out part-way
+    """
+    try:
+        # Validate file
+        validation_error = validate_file(file, MAX_FILE_SIZE, ALLOWED_EXTENSIONS)
+        if validation_error:
+            raise HTTPException(status_code=400, detail=validation_error)
+
+        mode = mode or DEFAULT_EXTRACTION_MODE
+        if mode not in EXTRACTION_MODES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown extraction mode '{mode}'. Allowed modes: {', '.join(sorted(EXTRACTION_MODES))}"
+            )
+
+        deadline = min(timeout or DEFAULT_DEADLINE_SECONDS, MAX_DEADLINE_SECONDS)
+
+        logger.info(f"Processing file: {file.filename} (mode: {mode}, deadline: {deadline}s)")
+
+        # Save uploaded file temporarily
+        filename = file.filename or "unknown"
+        file_ext = os.path.splitext(filename)[1]
+        with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as temp_file:
+            temp_file_path = temp_file.name
+            content_hash = await save_uploaded_file(file, temp_file_path)
+
+        # Identical uploads already in flight share that run. The first
+        # request's file is processed and outlives the request itself, so it
+        # is deleted when the shared task finishes
+        started = False
+
+        def start():
+            nonlocal started
+            started = True
+            task = asyncio.ensure_future(process_upload(temp_file_path, filename, mode, deadline))
+            task.add_done_callback(lambda _: remove_temp_file(temp_file_path))
+            return task
+
+        try:
+            # The extension is part of the key since it selects the decoder
+            key = f"{mode}:{file_ext.lower()}:{content_hash}"
+            work = single_flight.do(key, start) if COALESCE_REQUESTS else start()
+            formatted_response = await run_until_disconnected(request, work)
+
+            # Return with formatted JSON and proper content type
+            return JSONResponse(
+                content=formatted_response,
+                status_code=200,
+                headers={"Content-Type": "application/json; charset=utf-8"}
+            )
+
+        finally:
+            # Clean up temporary file of a coalesced request
+            if not started:
+                remove_temp_file(temp_file_path)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error processing file {file.filename}: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Internal server error while processing file: {str(e)}"
+        )
 
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
-"""Custom HTTP exception handler"""
-return JSONResponse(
-status_code=exc.status_code,
-content=ErrorResponse(
-error=exc.detail,
-status_code=exc.status_code
-).dict()
-)
+    """Custom HTTP exception handler"""
+    return JSONResponse(
+        status_code=exc.status_code,
+        content=ErrorResponse(
+            error=exc.detail,
+            status_code=exc.status_code
+        ).dict()
+    )
 
 if __name__ == "__main__":
-uvicorn.run(
-"main:app",
-host="0.0.0.0",
-port=8000,
-reload=True,
-log_level="info"
-)
\ No newline at end of file
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        reload=True,
+        log_level="info"
+    )
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, NamedTuple
 from datetime import datetime
 
 class PatientInfo(BaseModel):
@@ -46,3 +46,26 @@ class ErrorResponse(BaseModel):
     error: str = Field(..., description="Error message")
     status_code: int = Field(..., description="HTTP status code")
     timestamp: str = Field(default_factory=lambda: datetime.now().isoformat(), description="Error timestamp")
+
+class WordBox(NamedTuple):
+    """Single OCR word with its bounding box, as reported by Tesseract"""
+    text: str
+    left: int
+    top: int
+    width: int
+    height: int
+    conf: float = -1.0
+    page: int = 0
+    block: int = 0
+    par: int = 0
+    line: int = 0
+    
+    @property
+    def right(self) -> int:
+        """Right edge of the word box"""
+        return self.left + self.width
+    
+    @property
+    def bottom(self) -> int:
+        """Bottom edge of the word box"""
+        return self.top + self.height
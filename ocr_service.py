@@ -1,124 +1,743 @@
 import os
 import fitz  # PyMuPDF
 import pytesseract
-from PIL import Image
+from PIL import Image, ImageSequence
+import hashlib
+import shlex
+import subprocess
 import tempfile
+import threading
+import time
 import logging
-from typing import List
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple, Union
+
+from models import WordBox
+from page_cache import PageCache
 
 logger = logging.getLogger(__name__)
 
+# A page to OCR: page number, content hash if known up front, and a loader
+# that renders or decodes the page image only when it is actually needed
+PageSource = Tuple[int, Optional[str], Callable[[], Image.Image]]
+
+class OCRInterrupted(Exception):
+    """Raised when OCR stops early because of a deadline or cancellation"""
+    
+    def __init__(self, reason: str, partial: Union[str, List[WordBox], None] = None, pages_completed: int = 0):
+        """
+        Initialize interruption error
+        
+        Args:
+            reason: 'deadline' if the time budget ran out, 'cancelled' otherwise
+            partial: Text or words extracted from the pages finished so far
+            pages_completed: Number of pages fully processed
+        """
+        super().__init__(reason)
+        self.reason = reason
+        self.partial = partial
+        self.pages_completed = pages_completed
+    
+    def __str__(self) -> str:
+        # Built on demand since callers fill in progress while the error propagates
+        return f"OCR interrupted ({self.reason}) after {self.pages_completed} page(s)"
+
+class CancellationToken:
+    """Deadline and cancellation signal shared between a request and its OCR work"""
+    
+    def __init__(self, timeout: Optional[float] = None):
+        """
+        Initialize token
+        
+        Args:
+            timeout: Time budget in seconds, or None for no deadline
+        """
+        self.deadline = time.monotonic() + timeout if timeout is not None else None
+        self._cancelled = threading.Event()
+    
+    def cancel(self) -> None:
+        """Cancel the work, e.g. because the client disconnected"""
+        self._cancelled.set()
+    
+    @property
+    def cancelled(self) -> bool:
+        """Whether cancel() has been called"""
+        return self._cancelled.is_set()
+    
+    @property
+    def expired(self) -> bool:
+        """Whether the deadline has passed"""
+        return self.deadline is not None and time.monotonic() >= self.deadline
+    
+    def remaining(self) -> Optional[float]:
+        """
+        Seconds left before the deadline
+        
+        Returns:
+            Optional[float]: Remaining time, or None without a deadline
+        """
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+    
+    def check(self) -> None:
+        """
+        Raise if the work should stop
+        
+        Raises:
+            OCRInterrupted: If the token was cancelled or its deadline passed
+        """
+        if self.cancelled:
+            raise OCRInterrupted('cancelled')
+        if self.expired:
+            raise OCRInterrupted('deadline')
+
 class OCRService:
     """Service for OCR text extraction from PDFs and images"""
     
-    def __init__(self):
-        """Initialize OCR service with Tesseract configuration"""
+    # How often a running Tesseract process is checked for cancellation
+    POLL_INTERVAL = 0.1
+    
+    # Longest image side worth decoding for OCR; in line with the ~1700px
+    # PDF pages are rendered at, and well below a 12+ MP phone photo
+    MAX_IMAGE_SIDE = 2000
+    
+    # EXIF orientation tag value to the transpose that puts the image upright
+    EXIF_TRANSPOSE = {
+        2: Image.Transpose.FLIP_LEFT_RIGHT,
+        3: Image.Transpose.ROTATE_180,
+        4: Image.Transpose.FLIP_TOP_BOTTOM,
+        5: Image.Transpose.TRANSPOSE,
+        6: Image.Transpose.ROTATE_270,
+        7: Image.Transpose.TRANSVERSE,
+        8: Image.Transpose.ROTATE_90
+    }
+    
+    # Zoom applied when rendering PDF pages
+    PDF_ZOOM = 2  # 2x zoom for better OCR accuracy
+    
+    def __init__(self, page_cache: Optional[PageCache] = None, page_workers: int = 1,
+                 tesseract_threads: Optional[int] = None):
+        """
+        Initialize OCR service with Tesseract configuration
+        
+        Args:
+            page_cache: Optional cache of per-page results, so pages repeated
+                across documents (disclaimers, legends, blank forms) skip
+                rendering and Tesseract
+            page_workers: Pages of one document OCR'd at the same time
+            tesseract_threads: OpenMP thread limit for each Tesseract process,
+                or None for Tesseract's default of one thread per core
+        """
         # Configure Tesseract path if needed (usually not required on Linux)
         # pytesseract.pytesseract.tesseract_cmd = '/usr/bin/tesseract'
         
         # OCR configuration for better medical text recognition
         self.ocr_config = '--oem 3 --psm 6 -c tessedit_char_whitelist=0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz.,:-/() '
+        
+        self.page_cache = page_cache
+        
+        # Topology settings; see autotune.py for choosing them per machine
+        self.page_workers = page_workers
+        self.tesseract_threads = tesseract_threads
     
-    def extract_text(self, file_path: str) -> str:
+    def extract_text(self, file_path: str, token: Optional[CancellationToken] = None) -> str:
         """
         Extract text from PDF or image file
         
         Args:
             file_path: Path to the file to process
+            token: Optional deadline/cancellation token
             
         Returns:
             str: Extracted text content
+            
+        Raises:
+            OCRInterrupted: If the token stops the work, carrying the text of finished pages
         """
         file_extension = os.path.splitext(file_path)[1].lower()
         
         try:
             if file_extension == '.pdf':
-                return self._extract_from_pdf(file_path)
+                return self._extract_from_pdf(file_path, token)
+            elif file_extension in ['.tif', '.tiff']:
+                return self._extract_from_tiff(file_path, token)
             elif file_extension in ['.png', '.jpg', '.jpeg']:
-                return self._extract_from_image(file_path)
+                return self._extract_from_image(file_path, token)
             else:
                 raise ValueError(f"Unsupported file format: {file_extension}")
+        except OCRInterrupted as e:
+            logger.warning(f"Stopped extracting text from {file_path}: {str(e)}")
+            raise
         except Exception as e:
             logger.error(f"Error extracting text from {file_path}: {str(e)}")
             raise
     
-    def _extract_from_pdf(self, pdf_path: str) -> str:
+    def extract_words(self, file_path: str, token: Optional[CancellationToken] = None) -> List[WordBox]:
+        """
+        Extract word-level boxes from PDF or image file
+        
+        Args:
+            file_path: Path to the file to process
+            token: Optional deadline/cancellation token
+            
+        Returns:
+            List[WordBox]: Recognized words with their bounding boxes
+            
+        Raises:
+            OCRInterrupted: If the token stops the work, carrying the words of finished pages
+        """
+        file_extension = os.path.splitext(file_path)[1].lower()
+        words: List[WordBox] = []
+        pages_completed = 0
+        
+        try:
+            if file_extension in ['.pdf', '.tif', '.tiff']:
+                if file_extension == '.pdf':
+                    pages = self._render_pdf_pages(file_path, token)
+                else:
+                    pages = self._read_tiff_frames(file_path, token)
+                for _, page_words in self._ocr_pages(pages, 'tsv', token):
+                    words.extend(page_words)
+                    pages_completed += 1
+                return words
+            elif file_extension in ['.png', '.jpg', '.jpeg']:
+                with Image.open(file_path) as image:
+                    return self._ocr_words(self._decode_image(image), token=token)
+            else:
+                raise ValueError(f"Unsupported file format: {file_extension}")
+        except OCRInterrupted as e:
+            e.partial, e.pages_completed = words, pages_completed
+            logger.warning(f"Stopped extracting words from {file_path}: {str(e)}")
+            raise
+        except Exception as e:
+            logger.error(f"Error extracting words from {file_path}: {str(e)}")
+            raise
+    
+    def _extract_from_pdf(self, pdf_path: str, token: Optional[CancellationToken] = None) -> str:
         """
         Extract text from PDF file by converting pages to images
         
         Args:
             pdf_path: Path to PDF file
+            token: Optional deadline/cancellation token
             
         Returns:
             str: Extracted text from all pages
         """
+        try:
+            return self._extract_from_pages(self._render_pdf_pages(pdf_path, token), token)
+            
+        except OCRInterrupted:
+            raise
+        except Exception as e:
+            logger.error(f"Error processing PDF {pdf_path}: {str(e)}")
+            raise
+    
+    def _extract_from_tiff(self, tiff_path: str, token: Optional[CancellationToken] = None) -> str:
+        """
+        Extract text from a single- or multi-page TIFF, one frame at a time
+        
+        Args:
+            tiff_path: Path to TIFF file
+            token: Optional deadline/cancellation token
+            
+        Returns:
+            str: Extracted text from all frames
+        """
+        try:
+            return self._extract_from_pages(self._read_tiff_frames(tiff_path, token), token)
+            
+        except OCRInterrupted:
+            raise
+        except Exception as e:
+            logger.error(f"Error processing TIFF {tiff_path}: {str(e)}")
+            raise
+    
+    def _extract_from_pages(self, pages: Iterator[PageSource],
+                            token: Optional[CancellationToken] = None) -> str:
+        """
+        OCR a sequence of page images, recording progress for partial results
+        
+        Args:
+            pages: Iterator of page sources
+            token: Optional deadline/cancellation token
+            
+        Returns:
+            str: Extracted text from all pages, separated by page markers
+        """
         extracted_text = []
+        pages_completed = 0
         
         try:
-            # Open PDF document
-            doc = fitz.open(pdf_path)
+            for page_num, page_text in self._ocr_pages(pages, 'txt', token):
+                pages_completed += 1
+                if page_text.strip():
+                    extracted_text.append(f"--- Page {page_num + 1} ---\n{page_text}")
+                    logger.info(f"Extracted {len(page_text)} characters from page {page_num + 1}")
+            
+            return '\n\n'.join(extracted_text)
+            
+        except OCRInterrupted as e:
+            e.partial, e.pages_completed = '\n\n'.join(extracted_text), pages_completed
+            raise
+    
+    def _render_pdf_pages(self, pdf_path: str,
+                          token: Optional[CancellationToken] = None) -> Iterator[PageSource]:
+        """
+        Yield PDF pages one at a time, rendering each only on demand
+        
+        Args:
+            pdf_path: Path to PDF file
+            token: Optional deadline/cancellation token, checked before each page
+            
+        Yields:
+            PageSource: Zero-based page number, content hash and page renderer
+        """
+        doc = fitz.open(pdf_path)
+        try:
             logger.info(f"Processing PDF with {len(doc)} pages")
             
+            # Digests of fonts and images shared by several pages of the document
+            resource_digests: Dict[int, bytes] = {}
+            
             for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
+                if token:
+                    token.check()
                 
-                # Convert page to image
-                mat = fitz.Matrix(2, 2)  # 2x zoom for better OCR accuracy
-                pix = page.get_pixmap(matrix=mat)
-                
-                # Save as temporary image
-                with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as temp_img:
-                    temp_img_path = temp_img.name
-                    pix.save(temp_img_path)
+                page = doc.load_page(page_num)
+                content_hash = self._pdf_page_hash(doc, page, resource_digests) if self._caching else None
                 
-                try:
-                    # Extract text from image
-                    page_text = self._extract_from_image(temp_img_path)
-                    if page_text.strip():
-                        extracted_text.append(f"--- Page {page_num + 1} ---\n{page_text}")
-                        logger.info(f"Extracted {len(page_text)} characters from page {page_num + 1}")
-                finally:
-                    # Clean up temporary image
-                    if os.path.exists(temp_img_path):
-                        os.unlink(temp_img_path)
-            
+                yield page_num, content_hash, lambda page=page: self._render_pdf_page(page)
+        finally:
             doc.close()
-            return '\n\n'.join(extracted_text)
+    
+    def _render_pdf_page(self, page: fitz.Page) -> Image.Image:
+        """
+        Render a PDF page to an image
+        
+        Args:
+            page: PyMuPDF page
+            
+        Returns:
+            Image.Image: Rendered RGB page
+        """
+        mat = fitz.Matrix(self.PDF_ZOOM, self.PDF_ZOOM)
+        pix = page.get_pixmap(matrix=mat, alpha=False)
+        return Image.frombytes('RGB', (pix.width, pix.height), pix.samples)
+    
+    def _pdf_page_hash(self, doc: fitz.Document, page: fitz.Page,
+                       resource_digests: Dict[int, bytes]) -> Optional[str]:
+        """
+        Hash what a PDF page renders from, without rendering it
+        
+        Covers the page geometry, its content stream and the fonts, images
+        and form XObjects it uses, keyed by resource name rather than xref
+        number so identical pages from different documents hash alike.
+        Pages with annotations are left to the pixel hash.
+        
+        Args:
+            doc: Open PyMuPDF document
+            page: Page to hash
+            resource_digests: Per-document memo of resource digests by xref
+            
+        Returns:
+            Optional[str]: Hex digest, or None if the page cannot be hashed this way
+        """
+        def resource_digest(xref: int, read: Callable[[int], bytes]) -> bytes:
+            if xref not in resource_digests:
+                resource_digests[xref] = hashlib.sha256(read(xref) or b'').digest()
+            return resource_digests[xref]
+        
+        try:
+            if page.first_annot is not None:
+                return None
+            
+            digest = hashlib.sha256()
+            digest.update(repr((tuple(page.rect), page.rotation)).encode())
+            digest.update(page.read_contents())
+            
+            for xref, _, _, basefont, name, encoding, _ in sorted(page.get_fonts(full=True), key=lambda f: f[4]):
+                digest.update(f"font:{name}:{basefont}:{encoding}".encode())
+                if xref > 0:
+                    digest.update(resource_digest(xref, lambda x: doc.extract_font(x)[3]))
+            
+            for image in sorted(page.get_images(full=True), key=lambda i: i[7]):
+                xref, smask, width, height, bpc, colorspace, _, name = image[:8]
+                digest.update(f"image:{name}:{width}x{height}:{bpc}:{colorspace}".encode())
+                digest.update(resource_digest(xref, doc.xref_stream_raw))
+                if smask > 0:
+                    digest.update(resource_digest(smask, doc.xref_stream_raw))
+            
+            for xref, name, _, bbox in sorted(page.get_xobjects(), key=lambda x: x[1]):
+                digest.update(f"xobject:{name}:{tuple(bbox)}".encode())
+                digest.update(resource_digest(xref, doc.xref_stream_raw))
+            
+            return digest.hexdigest()
             
         except Exception as e:
-            logger.error(f"Error processing PDF {pdf_path}: {str(e)}")
-            raise
+            logger.debug(f"Falling back to pixel hash for page {page.number + 1}: {str(e)}")
+            return None
     
-    def _extract_from_image(self, image_path: str) -> str:
+    def _read_tiff_frames(self, tiff_path: str,
+                          token: Optional[CancellationToken] = None) -> Iterator[PageSource]:
+        """
+        Decode TIFF frames one at a time
+        
+        Only the current frame is held in memory, so long scanner batches
+        are processed in a streaming fashion.
+        
+        Args:
+            tiff_path: Path to TIFF file
+            token: Optional deadline/cancellation token, checked before each frame
+            
+        Yields:
+            PageSource: Zero-based frame number, no content hash and frame decoder
+        """
+        with Image.open(tiff_path) as tiff:
+            logger.info(f"Processing TIFF with {getattr(tiff, 'n_frames', 1)} frames")
+            
+            for page_num, frame in enumerate(ImageSequence.Iterator(tiff)):
+                if token:
+                    token.check()
+                
+                yield page_num, None, lambda frame=frame: self._decode_image(frame)
+    
+    def _extract_from_image(self, image_path: str, token: Optional[CancellationToken] = None) -> str:
         """
         Extract text from image file using Tesseract OCR
         
         Args:
             image_path: Path to image file
+            token: Optional deadline/cancellation token
             
         Returns:
             str: Extracted text content
         """
         try:
-            # Open and preprocess image
-            image = Image.open(image_path)
+            with Image.open(image_path) as image:
+                return self._ocr_text(self._decode_image(image), token)
             
-            # Convert to RGB if necessary
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
+        except OCRInterrupted:
+            raise
+        except Exception as e:
+            logger.error(f"Error processing image {image_path}: {str(e)}")
+            raise
+    
+    @property
+    def _caching(self) -> bool:
+        """Whether page results are cached"""
+        return self.page_cache is not None and self.page_cache.enabled
+    
+    def _ocr_pages(self, pages: Iterator[PageSource], extension: str,
+                   token: Optional[CancellationToken] = None) -> Iterator[Tuple[int, Any]]:
+        """
+        OCR a sequence of pages, up to page_workers at a time
+        
+        Pages are rendered or decoded on the calling thread, since neither
+        PyMuPDF documents nor TIFF frame iterators may be shared between
+        threads; preprocessing and Tesseract run in parallel. Results are yielded
+        in page order, and at most page_workers + 1 page images are held at
+        once. When the token stops the work, every page that did finish is
+        still yielded, in page order, before OCRInterrupted is raised, so a
+        slow page does not discard the finished pages after it.
+        
+        Args:
+            pages: Iterator of page sources
+            extension: 'txt' for plain text or 'tsv' for word boxes
+            token: Optional deadline/cancellation token
             
-            # Enhance image quality for better OCR
-            image = self._preprocess_image(image)
+        Yields:
+            Tuple[int, Any]: Zero-based page number and its text or words
+        """
+        if self.page_workers <= 1:
+            for page in pages:
+                yield page[0], self._ocr_page(page, extension, token)
+            return
+        
+        pending: Deque[Tuple[int, Future]] = deque()
+        with ThreadPoolExecutor(max_workers=self.page_workers, thread_name_prefix='ocr-page') as executor:
+            try:
+                for page in pages:
+                    cached, key, image = self._load_page(page, extension)
+                    if cached is not None:
+                        future = Future()
+                        future.set_result(cached)
+                    else:
+                        future = executor.submit(self._recognize_page, page[0], image, extension, key, token)
+                    pending.append((page[0], future))
+                    
+                    while len(pending) > self.page_workers:
+                        page_num, future = pending.popleft()
+                        yield page_num, future.result()
+                
+                while pending:
+                    page_num, future = pending.popleft()
+                    yield page_num, future.result()
+            except OCRInterrupted:
+                # Pages still running see the same token and stop within a poll
+                # interval; wait for them, then hand back those that finished
+                executor.shutdown(wait=True, cancel_futures=True)
+                for page_num, future in pending:
+                    if not future.cancelled() and future.exception() is None:
+                        yield page_num, future.result()
+                raise
+            finally:
+                # Pages still running see the same token; drop those not started
+                for _, future in pending:
+                    future.cancel()
+    
+    def _ocr_page(self, page: PageSource, extension: str,
+                  token: Optional[CancellationToken] = None) -> Union[str, List[WordBox]]:
+        """
+        OCR one page, reusing the cached result for a page seen before
+        
+        Args:
+            page: Page source to process
+            extension: 'txt' for plain text or 'tsv' for word boxes
+            token: Optional deadline/cancellation token
             
-            # Extract text using Tesseract
-            text = pytesseract.image_to_string(image, config=self.ocr_config)
+        Returns:
+            Union[str, List[WordBox]]: Page text or words
+        """
+        cached, key, image = self._load_page(page, extension)
+        if cached is not None:
+            return cached
+        return self._recognize_page(page[0], image, extension, key, token)
+    
+    def _load_page(self, page: PageSource, extension: str) -> Tuple[Any, Optional[str], Optional[Image.Image]]:
+        """
+        Look a page up in the page cache, loading its image on a miss
+        
+        The cache key is the page's content hash when the source provides
+        one, which skips rendering as well as Tesseract on a hit; otherwise
+        it is a hash of the rendered pixels, which still skips Tesseract.
+        
+        Args:
+            page: Page source to load
+            extension: 'txt' for plain text or 'tsv' for word boxes
             
-            logger.info(f"Extracted {len(text)} characters from image")
-            return text
+        Returns:
+            Tuple: Cached result or None, cache key (None without a cache)
+            and the page image (None on a hit by content hash)
+        """
+        page_num, content_hash, load = page
+        image = None
+        
+        if not self._caching:
+            return None, None, load()
+        
+        if content_hash is None:
+            image = load()
+            content_hash = 'pixels:' + hashlib.sha256(
+                f"{image.mode}{image.size}".encode() + image.tobytes()
+            ).hexdigest()
+        key = f"{extension}:{self.PDF_ZOOM}:{self.ocr_config}:{content_hash}"
+        
+        cached = self.page_cache.get(key)
+        if cached is not None:
+            logger.info(f"Page {page_num + 1} served from page cache")
+            if extension == 'tsv':
+                cached = [word._replace(page=page_num) for word in cached]
+            return cached, key, image
+        
+        if image is None:
+            image = load()
+        return None, key, image
+    
+    def _recognize_page(self, page_num: int, image: Image.Image, extension: str, key: Optional[str],
+                        token: Optional[CancellationToken] = None) -> Union[str, List[WordBox]]:
+        """
+        Run Tesseract on a loaded page and cache the result
+        
+        Args:
+            page_num: Zero-based page number
+            image: Page image
+            extension: 'txt' for plain text or 'tsv' for word boxes
+            key: Page cache key, or None without a cache
+            token: Optional deadline/cancellation token
             
-        except Exception as e:
-            logger.error(f"Error processing image {image_path}: {str(e)}")
-            raise
+        Returns:
+            Union[str, List[WordBox]]: Page text or words
+        """
+        if extension == 'tsv':
+            result = self._ocr_words(image, page_num, token)
+        else:
+            result = self._ocr_text(image, token)
+        
+        if key is not None:
+            self.page_cache.put(key, result)
+        return result
+    
+    def _ocr_text(self, image: Image.Image, token: Optional[CancellationToken] = None) -> str:
+        """
+        Run Tesseract on an image and return plain text
+        
+        Args:
+            image: PIL Image object
+            token: Optional deadline/cancellation token
+            
+        Returns:
+            str: Extracted text content
+        """
+        # Enhance image quality for better OCR
+        image = self._preprocess_image(image)
+        
+        # Extract text using Tesseract
+        text = self._run_tesseract(image, 'txt', token)
+        
+        logger.info(f"Extracted {len(text)} characters from image")
+        return text
+    
+    def _ocr_words(self, image: Image.Image, page_num: int = 0,
+                   token: Optional[CancellationToken] = None) -> List[WordBox]:
+        """
+        Run Tesseract on an image and return word-level boxes
+        
+        Box coordinates are relative to the preprocessed image, which is
+        all the layout parser needs since it only compares words on the
+        same page.
+        
+        Args:
+            image: PIL Image object
+            page_num: Page number to tag the words with
+            token: Optional deadline/cancellation token
+            
+        Returns:
+            List[WordBox]: Recognized non-empty words
+        """
+        image = self._preprocess_image(image)
+        tsv = self._run_tesseract(image, 'tsv', token)
+        
+        words = []
+        rows = tsv.splitlines()
+        header = rows[0].split('\t') if rows else []
+        for row in rows[1:]:
+            data = dict(zip(header, row.split('\t')))
+            text = data.get('text', '').strip()
+            if not text:
+                continue
+            words.append(WordBox(
+                text=text,
+                left=int(data['left']),
+                top=int(data['top']),
+                width=int(data['width']),
+                height=int(data['height']),
+                conf=float(data['conf']),
+                page=page_num,
+                block=int(data['block_num']),
+                par=int(data['par_num']),
+                line=int(data['line_num'])
+            ))
+        
+        logger.info(f"Extracted {len(words)} words from image")
+        return words
+    
+    def _run_tesseract(self, image: Image.Image, extension: str,
+                       token: Optional[CancellationToken] = None) -> str:
+        """
+        Run the Tesseract binary on an image as a killable subprocess
+        
+        pytesseract only kills Tesseract on its own timeout, so the process
+        is managed here to also stop it when the token is cancelled.
+        
+        Args:
+            image: Preprocessed PIL Image object
+            extension: Tesseract output format, 'txt' or 'tsv'
+            token: Optional deadline/cancellation token
+            
+        Returns:
+            str: Tesseract output
+            
+        Raises:
+            OCRInterrupted: If the token stops the work
+            pytesseract.TesseractError: If Tesseract fails
+        """
+        if token:
+            token.check()
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_path = os.path.join(temp_dir, 'input.png')
+            output_base = os.path.join(temp_dir, 'output')
+            image.save(input_path)
+            
+            command = [pytesseract.pytesseract.tesseract_cmd, input_path, output_base]
+            command += shlex.split(self.ocr_config) + [extension]
+            
+            # Cap Tesseract's OpenMP threads so parallel pages and workers do not oversubscribe the cores
+            env = None
+            if self.tesseract_threads:
+                env = dict(os.environ, OMP_THREAD_LIMIT=str(self.tesseract_threads))
+            
+            proc = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, env=env)
+            try:
+                while True:
+                    try:
+                        _, stderr = proc.communicate(timeout=self.POLL_INTERVAL)
+                        break
+                    except subprocess.TimeoutExpired:
+                        if token:
+                            token.check()
+            except BaseException:
+                # Interrupted or failed while waiting: never leave Tesseract running
+                proc.kill()
+                proc.wait()
+                proc.stderr.close()
+                raise
+            
+            if proc.returncode != 0:
+                message = stderr.decode('utf-8', errors='ignore').strip()
+                raise pytesseract.TesseractError(proc.returncode, message)
+            
+            with open(f"{output_base}.{extension}", encoding='utf-8') as f:
+                return f.read()
+    
+    def _decode_image(self, image: Image.Image) -> Image.Image:
+        """
+        Decode an opened image at no more than the resolution OCR needs
+        
+        JPEGs use draft mode, letting the decoder produce grayscale at a
+        reduced DCT scale instead of decoding full-size RGB. Anything still
+        larger than MAX_IMAGE_SIDE is downscaled, and EXIF orientation is
+        applied last, on the smallest image.
+        
+        Frames of a multi-frame file are always returned as a new image: a
+        TIFF frame is the file's single image object seeked to that frame,
+        so the next frame would overwrite a page still being OCR'd.
+        
+        Args:
+            image: Opened, not yet loaded, PIL Image object
+            
+        Returns:
+            Image.Image: Upright grayscale image
+        """
+        source = image
+        orientation = image.getexif().get(0x0112)  # EXIF Orientation tag
+        
+        width, height = image.size
+        scale = min(1.0, self.MAX_IMAGE_SIDE / max(width, height))
+        target_size = (max(1, int(width * scale)), max(1, int(height * scale)))
+        
+        if image.format == 'JPEG':
+            image.draft('L', target_size)
+        
+        # Bilevel scans convert straight to grayscale; palette, alpha and
+        # CMYK images go through RGB
+        if image.mode not in ('1', 'L', 'RGB'):
+            image = image.convert('RGB')
+        if image.mode != 'L':
+            image = image.convert('L')
+        
+        if max(image.size) > self.MAX_IMAGE_SIDE:
+            image = image.resize(target_size, Image.Resampling.LANCZOS, reducing_gap=2.0)
+        
+        if orientation in self.EXIF_TRANSPOSE:
+            image = image.transpose(self.EXIF_TRANSPOSE[orientation])
+        
+        if image is source and getattr(source, 'n_frames', 1) > 1:
+            image = image.copy()
+        return image
     
     def _preprocess_image(self, image: Image.Image) -> Image.Image:
         """
@@ -131,6 +750,10 @@ class OCRService:
             Image.Image: Preprocessed image
         """
         # Convert to grayscale for better OCR
+        # Bilevel scans convert straight to grayscale; palette, alpha and
+        # CMYK images go through RGB
+        if image.mode not in ('1', 'L', 'RGB'):
+            image = image.convert('RGB')
         if image.mode != 'L':
             image = image.convert('L')
         
@@ -0,0 +1,90 @@
+from collections import OrderedDict
+import threading
+import logging
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class PageCache:
+    """Thread-safe LRU cache of per-page OCR results"""
+
+    def __init__(self, max_entries: int = 512):
+        """
+        Initialize page cache
+
+        Args:
+            max_entries: Maximum number of cached pages; 0 disables caching
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the cache stores anything"""
+        return self.max_entries > 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Look up a page result and mark it as recently used
+
+        Args:
+            key: Page cache key
+
+        Returns:
+            Optional[Any]: Cached result or None on a miss
+        """
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: Any) -> None:
+        """
+        Store a page result, evicting the least recently used pages if full
+
+        Args:
+            key: Page cache key
+            value: OCR result for the page
+        """
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop all cached pages and reset counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache metrics
+
+        Returns:
+            Dict[str, Any]: Hit, miss and eviction counts, size and hit rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
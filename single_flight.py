@@ -0,0 +1,74 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+class _Flight:
+    """Shared in-flight task and the number of callers waiting on it"""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key onto one in-flight task"""
+
+    def __init__(self):
+        """Initialize with no calls in flight"""
+        self._flights: Dict[str, _Flight] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, start: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run start() for the first caller with this key; later callers share its result
+
+        The shared task is cancelled only once every caller waiting on it
+        has gone away, so one client giving up does not fail the others.
+
+        Args:
+            key: Identity of the work, e.g. a content hash of the upload
+            start: Called only if no call with this key is in flight
+
+        Returns:
+            Any: Result of the shared task (its exception is raised to every caller)
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(start()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _, flight=flight: self._forget(key, flight))
+            self.executions += 1
+        else:
+            self.coalesced += 1
+            logger.info(f"Coalescing request onto in-flight work {key[:12]}")
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                logger.info(f"All callers left, cancelling in-flight work {key[:12]}")
+                # Forget it first so a caller arriving before the task finishes starts afresh
+                self._forget(key, flight)
+                flight.task.cancel()
+
+    def _forget(self, key: str, flight: _Flight) -> None:
+        """Drop a finished flight so the next call with its key starts fresh"""
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get coalescing metrics
+
+        Returns:
+            Dict[str, int]: Executions, coalesced requests and keys in flight
+        """
+        return {
+            'executions': self.executions,
+            'coalesced': self.coalesced,
+            'in_flight': len(self._flights)
+        }
@@ -0,0 +1,55 @@
+import os
+import sys
+import time
+
+import pytest
+from PIL import Image
+
+# Make the application modules importable when running `pytest` from the repo root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ocr_service import OCRService  # noqa: E402
+
+FRAME_VALUES = [10, 60, 110, 160, 210]
+
+TSV_HEADER = 'level\tpage_num\tblock_num\tpar_num\tline_num\tword_num\tleft\ttop\twidth\theight\tconf\ttext'
+
+@pytest.fixture
+def make_tiff(tmp_path):
+    """Write a grayscale TIFF with one uniform 1500x1800 frame per pixel value"""
+    def make(values=FRAME_VALUES):
+        frames = [Image.new('L', (1500, 1800), value) for value in values]
+        path = tmp_path / "scan.tiff"
+        frames[0].save(path, save_all=True, append_images=frames[1:])
+        return str(path)
+    return make
+
+@pytest.fixture
+def tiff_path(make_tiff):
+    """5-frame grayscale TIFF small enough to be OCR'd without conversion or resizing"""
+    return make_tiff()
+
+@pytest.fixture
+def page_delays():
+    """Seconds the fake Tesseract spends on a page, keyed by the page's pixel value"""
+    return {}
+
+@pytest.fixture
+def fake_tesseract(monkeypatch, page_delays):
+    """Replace the Tesseract subprocess with one reporting the page's pixel value"""
+    def run_tesseract(self, image, extension, token=None):
+        value = image.getpixel((0, 0))
+        done_at = time.monotonic() + page_delays.get(value, 0)
+        while True:
+            # Like the real subprocess, stop as soon as the token says so
+            if token:
+                token.check()
+            if time.monotonic() >= done_at:
+                break
+            time.sleep(0.01)
+
+        if extension == 'tsv':
+            return f"{TSV_HEADER}\n5\t1\t1\t1\t1\t1\t10\t10\t50\t20\t95\tpixel{value}\n"
+        return f"pixel {value}"
+
+    monkeypatch.setattr(OCRService, '_run_tesseract', run_tesseract)
@@ -0,0 +1,51 @@
+import pytest
+
+from autotune import (MAX_OVERSUBSCRIPTION, MAX_PAGE_WORKERS, MAX_TESSERACT_THREADS, Topology,
+                      candidate_topologies, load_topology, pick_best, save_topology)
+
+def trial(workers, page_workers, threads, rate):
+    return {'workers': workers, 'page_workers': page_workers, 'tesseract_threads': threads,
+            'pages_per_second': rate}
+
+def test_single_core_has_one_candidate():
+    assert candidate_topologies(1) == [(1, 1, 1)]
+
+@pytest.mark.parametrize('cpu_count', [2, 6, 8, 16, 64, 256])
+def test_candidates_keep_cores_busy_without_heavy_oversubscription(cpu_count):
+    candidates = candidate_topologies(cpu_count)
+
+    assert 0 < len(candidates) <= 17
+    for workers, page_workers, threads in candidates:
+        assert cpu_count <= workers * page_workers * threads <= cpu_count * MAX_OVERSUBSCRIPTION
+        assert page_workers <= MAX_PAGE_WORKERS
+        assert threads <= MAX_TESSERACT_THREADS
+
+def test_candidates_are_ordered_fewest_threads_first():
+    totals = [w * p * t for w, p, t in candidate_topologies(8)]
+
+    assert totals == sorted(totals)
+
+def test_near_tie_goes_to_leaner_topology():
+    trials = [trial(4, 4, 1, 10.2), trial(8, 1, 1, 10.0)]
+
+    assert pick_best(trials) == trial(8, 1, 1, 10.0)
+
+def test_clear_winner_beats_leaner_topology():
+    trials = [trial(8, 1, 1, 10.0), trial(4, 4, 1, 12.0)]
+
+    assert pick_best(trials) == trial(4, 4, 1, 12.0)
+
+def test_topology_round_trips_through_file(tmp_path):
+    path = str(tmp_path / "topology.json")
+    topology = Topology(workers=4, page_workers=2, tesseract_threads=1, pages_per_second=3.5, cpu_count=8)
+
+    save_topology(topology, path)
+
+    assert load_topology(path) == topology
+
+def test_unreadable_topology_file_is_ignored(tmp_path):
+    path = tmp_path / "topology.json"
+    path.write_text("{not json")
+
+    assert load_topology(str(path)) is None
+    assert load_topology(str(tmp_path / "missing.json")) is None
@@ -0,0 +1,122 @@
+import pytest
+
+from broker import DONE, FAILED, QUEUED, RUNNING, SQLiteBroker, create_broker
+
+# A lease that has already run out, as if its worker stopped heartbeating
+EXPIRED = -1
+
+@pytest.fixture
+def broker(tmp_path):
+    return SQLiteBroker(str(tmp_path / "queue.db"), max_attempts=2)
+
+def test_claim_complete_and_collect(broker):
+    task_id = broker.enqueue(b'%PDF', 'report.pdf', {'mode': 'text'})
+
+    task = broker.claim('w1', 60)
+    assert (task.id, task.filename, task.payload, task.options, task.attempts) == \
+        (task_id, 'report.pdf', b'%PDF', {'mode': 'text'}, 1)
+    assert broker.claim('w2', 60) is None
+
+    broker.complete(task_id, 'w1', {'patient_info': {}})
+
+    status = broker.get_status(task_id)
+    assert (status['status'], status['result']) == (DONE, {'patient_info': {}})
+
+    broker.delete(task_id)
+    assert broker.get_status(task_id) is None
+
+def test_expired_lease_is_reclaimed_by_another_worker(broker):
+    task_id = broker.enqueue(b'data', 'scan.png', {})
+    broker.claim('w1', EXPIRED)
+
+    task = broker.claim('w2', 60)
+
+    assert (task.id, task.attempts) == (task_id, 2)
+    assert not broker.extend(task_id, 'w1', 60)
+    assert broker.extend(task_id, 'w2', 60)
+
+def test_result_from_lost_lease_is_discarded(broker):
+    task_id = broker.enqueue(b'data', 'scan.png', {})
+    broker.claim('w1', EXPIRED)
+    broker.claim('w2', 60)
+
+    broker.complete(task_id, 'w1', {'stale': True})
+
+    assert broker.get_status(task_id)['status'] == RUNNING
+
+def test_expired_lease_on_last_attempt_fails_task(broker):
+    task_id = broker.enqueue(b'data', 'scan.png', {})
+    broker.claim('w1', EXPIRED)
+    broker.claim('w2', EXPIRED)
+
+    assert broker.claim('w3', 60) is None
+    status = broker.get_status(task_id)
+    assert (status['status'], status['status_code'], status['attempts']) == (FAILED, 500, 2)
+
+def test_failure_is_retried_until_max_attempts(broker):
+    task_id = broker.enqueue(b'data', 'scan.png', {})
+
+    broker.claim('w1', 60)
+    broker.fail(task_id, 'w1', 'Tesseract crashed')
+    assert broker.get_status(task_id)['status'] == QUEUED
+
+    broker.claim('w1', 60)
+    broker.fail(task_id, 'w1', 'Tesseract crashed')
+    status = broker.get_status(task_id)
+    assert (status['status'], status['error']) == (FAILED, 'Tesseract crashed')
+
+def test_fail_without_retry_fails_immediately(broker):
+    task_id = broker.enqueue(b'data', 'blank.png', {})
+    broker.claim('w1', 60)
+
+    broker.fail(task_id, 'w1', 'No text could be extracted', status_code=422, retry=False)
+
+    status = broker.get_status(task_id)
+    assert (status['status'], status['status_code'], status['attempts']) == (FAILED, 422, 1)
+    assert broker.claim('w2', 60) is None
+
+def test_deleted_task_stops_its_worker(broker):
+    task_id = broker.enqueue(b'data', 'scan.png', {})
+    broker.claim('w1', 60)
+
+    broker.delete(task_id)
+
+    assert not broker.extend(task_id, 'w1', 60)
+
+def test_stats_count_tasks_by_state(broker):
+    broker.enqueue(b'a', 'a.png', {})
+    broker.enqueue(b'b', 'b.png', {})
+    broker.claim('w1', 60)
+
+    assert broker.stats() == {QUEUED: 1, RUNNING: 1, DONE: 0, FAILED: 0}
+
+def test_create_broker_parses_sqlite_urls(tmp_path):
+    broker = create_broker(f"sqlite:///{tmp_path}/queue.db")
+
+    assert isinstance(broker, SQLiteBroker)
+    assert broker.path == f"{tmp_path}/queue.db"
+
+    with pytest.raises(ValueError):
+        create_broker("redis://localhost:6379/0")
+
+def test_claim_purges_finished_tasks_past_retention(tmp_path):
+    broker = SQLiteBroker(str(tmp_path / "queue.db"), retention_seconds=0)
+    collected = broker.enqueue(b'a', 'a.png', {})
+    broker.claim('w1', 60)
+    broker.complete(collected, 'w1', {})
+    abandoned = broker.enqueue(b'b', 'b.png', {})
+    broker.claim('w1', 60)
+    broker.fail(abandoned, 'w1', 'Unreadable image', retry=False)
+    queued = broker.enqueue(b'c', 'c.png', {})
+
+    assert broker.claim('w2', 60).id == queued
+    assert broker.get_status(collected) is None
+    assert broker.get_status(abandoned) is None
+
+def test_finished_tasks_within_retention_are_kept(broker):
+    task_id = broker.enqueue(b'a', 'a.png', {})
+    broker.claim('w1', 60)
+    broker.complete(task_id, 'w1', {})
+
+    assert broker.claim('w2', 60) is None
+    assert broker.get_status(task_id)['status'] == DONE
@@ -0,0 +1,55 @@
+import pytest
+
+from extraction import ExtractionError, extract_report
+from field_parser import FieldParser
+from ocr_service import CancellationToken, OCRInterrupted, OCRService
+
+@pytest.fixture
+def field_parser():
+    return FieldParser()
+
+@pytest.mark.parametrize('mode', ['text', 'layout'])
+def test_deadline_part_way_returns_partial_result(make_tiff, fake_tesseract, page_delays, field_parser, mode):
+    path = make_tiff([10, 60, 110])
+    page_delays.update({110: 5.0})
+
+    report = extract_report(OCRService(), field_parser, path, 'scan.tiff', mode, CancellationToken(0.5))
+
+    assert report['partial'] is True
+    assert report['pages_completed'] == 2
+
+def test_complete_run_is_not_marked_partial(make_tiff, fake_tesseract, field_parser):
+    report = extract_report(OCRService(), field_parser, make_tiff(), 'scan.tiff', 'text', CancellationToken(10))
+
+    assert 'partial' not in report
+    assert 'pages_completed' not in report
+
+def test_deadline_before_first_page_raises_504(make_tiff, fake_tesseract, page_delays, field_parser):
+    path = make_tiff([10, 60])
+    page_delays.update({10: 5.0})
+
+    with pytest.raises(ExtractionError) as exc_info:
+        extract_report(OCRService(), field_parser, path, 'scan.tiff', 'text', CancellationToken(0.3))
+
+    assert exc_info.value.status_code == 504
+
+def test_cancelled_token_raises_499(make_tiff, fake_tesseract, field_parser):
+    token = CancellationToken()
+    token.cancel()
+
+    with pytest.raises(ExtractionError) as exc_info:
+        extract_report(OCRService(), field_parser, make_tiff(), 'scan.tiff', 'text', token)
+
+    assert exc_info.value.status_code == 499
+
+class BlankPagesThenDeadline:
+    """OCR service whose finished pages held no text when the deadline hit"""
+
+    def extract_text(self, file_path, token=None):
+        raise OCRInterrupted('deadline', partial='', pages_completed=2)
+
+def test_blank_finished_pages_are_not_reported_as_timeout(field_parser):
+    with pytest.raises(ExtractionError) as exc_info:
+        extract_report(BlankPagesThenDeadline(), field_parser, 'scan.pdf', 'scan.pdf', 'text')
+
+    assert exc_info.value.status_code == 422
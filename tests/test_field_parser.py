@@ -0,0 +1,76 @@
+import pytest
+
+from field_parser import FieldParser
+from models import WordBox
+
+def line(top, *words, line_num, block=1):
+    """Word boxes of one OCR line, each given as (text, left)"""
+    return [
+        WordBox(text=text, left=left, top=top, width=10 * len(text), height=20, conf=95.0,
+                page=0, block=block, par=1, line=line_num)
+        for text, left in words
+    ]
+
+@pytest.fixture
+def parser():
+    return FieldParser()
+
+def test_two_column_header_keeps_columns_apart(parser):
+    words = line(10, ("Name", 10), ("JOHN", 80), ("DOE", 140), ("Sex", 600), ("Male", 660), line_num=1)
+
+    report = parser.parse_from_words(words)
+
+    assert report.patient_info.name == "JOHN DOE"
+    assert report.patient_info.sex == "Male"
+
+def test_value_below_label(parser):
+    words = (
+        line(10, ("Referring", 10), ("Physician", 110), ("Accession", 600), ("number", 700), line_num=1)
+        + line(35, ("DR.", 10), ("SMITH", 50), ("A123", 600), line_num=2)
+    )
+
+    report = parser.parse_from_words(words)
+
+    assert report.patient_info.referring_physician == "DR. SMITH"
+    assert report.patient_info.accession_number == "A123"
+
+def test_value_below_label_skips_other_column_block(parser):
+    # Tesseract puts each header column in its own block, so the right
+    # column's line at about the label's height sorts between the label and its value
+    words = (
+        line(100, ("Institutionaddress", 10), line_num=1, block=1)
+        + line(130, ("SURAT", 10), line_num=2, block=1)
+        + line(74, ("Physician", 600), line_num=1, block=2)
+        + line(104, ("DR.", 600), ("SMITH", 640), line_num=2, block=2)
+    )
+
+    report = parser.parse_from_words(words)
+
+    assert report.report_details.institution_address == "SURAT"
+    assert report.report_details.physician == "DR. SMITH"
+
+def test_value_far_below_label_is_not_taken(parser):
+    words = (
+        line(10, ("Comments", 10), line_num=1)
+        + line(300, ("Unrelated", 10), ("footer", 120), line_num=2)
+    )
+
+    report = parser.parse_from_words(words)
+
+    assert report.patient_info.comments is None
+
+def test_patient_id_falls_back_to_unlabelled_token(parser):
+    words = (
+        line(10, ("Name", 10), ("JOHN", 80), ("DOE", 140), line_num=1)
+        + line(35, ("MR/123/45Y", 10), line_num=2)
+    )
+
+    report = parser.parse_from_words(words)
+
+    assert report.patient_info.id == "MR/123/45Y"
+
+def test_no_labels_leaves_fields_empty(parser):
+    report = parser.parse_from_words(line(10, ("lorem", 10), ("ipsum", 80), line_num=1))
+
+    assert report.patient_info.name is None
+    assert report.patient_info.id is None
@@ -0,0 +1,48 @@
+import pytest
+
+from loadtest import _parse_weighted, find_knee, percentile
+
+def test_percentile_of_empty_list_is_none():
+    assert percentile([], 50) is None
+
+@pytest.mark.parametrize('values, pct, expected', [
+    ([5.0], 0, 5.0),
+    ([5.0], 99, 5.0),
+    ([1.0, 2.0], 50, 1.0),
+    ([1.0, 2.0], 51, 2.0),
+    ([1.0, 2.0], 95, 2.0),
+    ([1.0, 2.0, 3.0, 4.0], 75, 3.0),
+    ([1.0, 2.0, 3.0, 4.0], 99, 4.0),
+    ([1.0, 2.0, 3.0, 4.0], 100, 4.0),
+])
+def test_percentile_uses_nearest_rank(values, pct, expected):
+    assert percentile(values, pct) == expected
+
+def test_knee_of_linear_then_flat_curve():
+    levels = [1, 2, 3, 4, 5, 6, 7, 8]
+    throughputs = [1.0, 2.0, 3.0, 4.0, 4.1, 4.2, 4.2, 4.2]
+
+    assert find_knee(levels, throughputs) == 3
+
+def test_knee_ignores_collapse_after_peak():
+    levels = [1, 2, 3, 4, 5, 6, 7, 8]
+    throughputs = [1.0, 2.0, 3.0, 4.0, 4.2, 2.0, 1.0, 0.5]
+
+    assert find_knee(levels, throughputs) == 3
+
+def test_knee_of_short_or_empty_curve():
+    assert find_knee([], []) is None
+    assert find_knee([1, 2], [1.0, 2.0]) == 1
+    assert find_knee([1, 2, 3], [2.0, 1.0, 0.5]) == 0
+
+@pytest.mark.parametrize('value, expected', [
+    ('report.pdf', ('report.pdf', 1.0)),
+    ('report.pdf:3', ('report.pdf', 3.0)),
+    ('scan.jpg:0.5', ('scan.jpg', 0.5)),
+    (r'C:\reports\scan.jpg', (r'C:\reports\scan.jpg', 1.0)),
+    (r'C:\reports\scan.jpg:2', (r'C:\reports\scan.jpg', 2.0)),
+    ('/data/12:30/report.pdf:4', ('/data/12:30/report.pdf', 4.0)),
+    ('/extract?mode=layout:2', ('/extract?mode=layout', 2.0)),
+])
+def test_parse_weighted_splits_on_last_colon(value, expected):
+    assert _parse_weighted(value) == expected
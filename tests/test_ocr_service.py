@@ -0,0 +1,144 @@
+import os
+import threading
+import time
+
+import pytesseract
+import pytest
+from PIL import Image
+
+from conftest import FRAME_VALUES
+from ocr_service import CancellationToken, OCRInterrupted, OCRService
+from page_cache import PageCache
+
+@pytest.mark.parametrize('page_workers', [1, 2, 3])
+@pytest.mark.parametrize('cached', [False, True])
+def test_tiff_frames_ocr_in_page_order_with_parallel_pages(tiff_path, fake_tesseract, page_workers, cached):
+    service = OCRService(page_cache=PageCache(64) if cached else None, page_workers=page_workers)
+
+    text = service.extract_text(tiff_path)
+
+    expected = '\n\n'.join(
+        f"--- Page {n + 1} ---\npixel {value}" for n, value in enumerate(FRAME_VALUES)
+    )
+    assert text == expected
+
+def test_decode_image_returns_independent_image(tiff_path):
+    with Image.open(tiff_path) as tiff:
+        decoded = OCRService()._decode_image(tiff)
+        tiff.seek(1)
+
+        assert decoded is not tiff
+        assert decoded.getpixel((0, 0)) == FRAME_VALUES[0]
+
+def test_decode_image_downscales_and_rotates_large_jpeg(tmp_path):
+    path = tmp_path / "photo.jpg"
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Rotated 90 degrees clockwise
+    Image.new('RGB', (4000, 3000), 'white').save(path, exif=exif)
+
+    with Image.open(path) as photo:
+        decoded = OCRService()._decode_image(photo)
+
+    assert (decoded.mode, decoded.size) == ('L', (1500, 2000))
+
+def test_decode_image_converts_bilevel_straight_to_grayscale(tmp_path):
+    path = tmp_path / "fax.png"
+    bilevel = Image.new('1', (40, 20), 1)
+    bilevel.paste(0, (0, 0, 20, 20))
+    bilevel.save(path)
+
+    with Image.open(path) as fax:
+        decoded = OCRService()._decode_image(fax)
+
+    assert decoded.mode == 'L'
+    assert (decoded.getpixel((0, 0)), decoded.getpixel((39, 0))) == (0, 255)
+
+def test_decode_image_does_not_copy_single_frame_image(tmp_path):
+    path = tmp_path / "scan.png"
+    Image.new('L', (40, 20), 128).save(path)
+
+    with Image.open(path) as scan:
+        assert OCRService()._decode_image(scan) is scan
+
+def test_deadline_keeps_pages_finished_after_a_slow_page(make_tiff, fake_tesseract, page_delays):
+    path = make_tiff([10, 60, 110, 160])
+    page_delays.update({10: 2.0, 60: 0.1, 110: 0.1, 160: 0.1})
+    service = OCRService(page_workers=4)
+
+    with pytest.raises(OCRInterrupted) as exc_info:
+        service.extract_text(path, CancellationToken(1.0))
+
+    assert exc_info.value.reason == 'deadline'
+    assert exc_info.value.pages_completed == 3
+    assert exc_info.value.partial == '\n\n'.join(
+        f"--- Page {n + 1} ---\npixel {value}" for n, value in [(1, 60), (2, 110), (3, 160)]
+    )
+
+def test_deadline_keeps_words_of_finished_pages(make_tiff, fake_tesseract, page_delays):
+    path = make_tiff([10, 60, 110])
+    page_delays.update({10: 2.0})
+    service = OCRService(page_workers=3)
+
+    with pytest.raises(OCRInterrupted) as exc_info:
+        service.extract_words(path, CancellationToken(1.0))
+
+    assert exc_info.value.pages_completed == 2
+    assert [(w.page, w.text) for w in exc_info.value.partial] == [(1, 'pixel60'), (2, 'pixel110')]
+
+def test_token_without_deadline_never_expires():
+    token = CancellationToken()
+
+    token.check()
+    assert token.remaining() is None
+    assert not token.expired
+
+def test_token_expires_after_its_timeout():
+    token = CancellationToken(0)
+
+    assert token.expired
+    assert token.remaining() == 0.0
+    with pytest.raises(OCRInterrupted) as exc_info:
+        token.check()
+    assert exc_info.value.reason == 'deadline'
+
+def test_cancelled_token_reports_cancellation_before_deadline():
+    token = CancellationToken(0)
+    token.cancel()
+
+    assert token.cancelled
+    with pytest.raises(OCRInterrupted) as exc_info:
+        token.check()
+    assert exc_info.value.reason == 'cancelled'
+
+@pytest.fixture
+def tesseract_script(tmp_path, monkeypatch):
+    """Point pytesseract at a shell script standing in for the Tesseract binary"""
+    def install(body):
+        script = tmp_path / "tesseract"
+        script.write_text(f"#!/bin/sh\n{body}\n")
+        script.chmod(0o755)
+        monkeypatch.setattr(pytesseract.pytesseract, 'tesseract_cmd', str(script))
+    return install
+
+def test_cancel_kills_running_tesseract(tmp_path, tesseract_script):
+    pid_file = tmp_path / "pid"
+    tesseract_script(f"echo $$ > {pid_file}\nexec sleep 30")
+    token = CancellationToken()
+    threading.Timer(0.3, token.cancel).start()
+
+    started = time.monotonic()
+    with pytest.raises(OCRInterrupted) as exc_info:
+        OCRService()._run_tesseract(Image.new('L', (100, 100), 255), 'txt', token)
+
+    assert exc_info.value.reason == 'cancelled'
+    assert time.monotonic() - started < 5
+    with pytest.raises(ProcessLookupError):
+        os.kill(int(pid_file.read_text()), 0)
+
+def test_tesseract_failure_raises_tesseract_error(tesseract_script):
+    tesseract_script("echo 'Error opening data file' >&2\nexit 1")
+
+    with pytest.raises(pytesseract.TesseractError) as exc_info:
+        OCRService()._run_tesseract(Image.new('L', (100, 100), 255), 'txt')
+
+    assert 'Error opening data file' in str(exc_info.value)
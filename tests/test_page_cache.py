@@ -0,0 +1,55 @@
+from page_cache import PageCache
+
+def test_get_and_put_count_hits_and_misses():
+    cache = PageCache(max_entries=2)
+
+    assert cache.get('a') is None
+    cache.put('a', 'text a')
+
+    assert cache.get('a') == 'text a'
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 1, 1)
+    assert stats['hit_rate'] == 0.5
+
+def test_evicts_least_recently_used():
+    cache = PageCache(max_entries=2)
+    cache.put('a', 'text a')
+    cache.put('b', 'text b')
+    cache.get('a')  # 'b' is now least recently used
+
+    cache.put('c', 'text c')
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 'text a'
+    assert cache.get('c') == 'text c'
+    assert cache.stats()['evictions'] == 1
+
+def test_put_replaces_existing_entry_without_evicting():
+    cache = PageCache(max_entries=2)
+    cache.put('a', 'old')
+    cache.put('b', 'text b')
+
+    cache.put('a', 'new')
+
+    assert cache.get('a') == 'new'
+    assert cache.stats()['evictions'] == 0
+
+def test_zero_size_disables_cache():
+    cache = PageCache(max_entries=0)
+    cache.put('a', 'text a')
+
+    assert not cache.enabled
+    assert cache.get('a') is None
+    assert cache.stats()['entries'] == 0
+
+def test_clear_drops_entries_and_counters():
+    cache = PageCache(max_entries=2)
+    cache.put('a', 'text a')
+    cache.get('a')
+    cache.get('b')
+
+    cache.clear()
+
+    assert cache.stats() == {
+        'entries': 0, 'max_entries': 2, 'hits': 0, 'misses': 0, 'evictions': 0, 'hit_rate': 0.0
+    }
@@ -0,0 +1,108 @@
+import asyncio
+
+from single_flight import SingleFlight
+
+def run(coro):
+    return asyncio.run(coro)
+
+def test_concurrent_calls_share_one_execution():
+    async def scenario():
+        flight = SingleFlight()
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return 'result'
+
+        results = await asyncio.gather(*(flight.do('key', work) for _ in range(3)))
+        return results, calls, flight.stats()
+
+    results, calls, stats = run(scenario())
+
+    assert results == ['result'] * 3
+    assert calls == 1
+    assert stats == {'executions': 1, 'coalesced': 2, 'in_flight': 0}
+
+def test_waiter_leaving_does_not_cancel_shared_work():
+    async def scenario():
+        flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def work():
+            await release.wait()
+            return 'result'
+
+        leaving = asyncio.ensure_future(flight.do('key', work))
+        staying = asyncio.ensure_future(flight.do('key', work))
+        await asyncio.sleep(0)
+
+        leaving.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        return await staying, leaving.cancelled()
+
+    result, left = run(scenario())
+
+    assert result == 'result'
+    assert left
+
+def test_last_waiter_leaving_cancels_shared_work():
+    async def scenario():
+        flight = SingleFlight()
+        cancelled = asyncio.Event()
+
+        async def work():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        waiter = asyncio.ensure_future(flight.do('key', work))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+        return flight.stats()
+
+    stats = run(scenario())
+
+    assert stats['in_flight'] == 0
+
+def test_caller_after_cancellation_starts_new_work():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def slow():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                # Still winding down when the next caller arrives
+                await asyncio.sleep(0.05)
+                raise
+
+        async def fresh():
+            return 'fresh'
+
+        waiter = asyncio.ensure_future(flight.do('key', slow))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.sleep(0)
+        return await flight.do('key', fresh)
+
+    assert run(scenario()) == 'fresh'
+
+def test_errors_reach_every_waiter():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.01)
+            raise ValueError('bad page')
+
+        return await asyncio.gather(*(flight.do('key', work) for _ in range(2)), return_exceptions=True)
+
+    results = run(scenario())
+
+    assert all(isinstance(r, ValueError) for r in results)
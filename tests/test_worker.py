@@ -0,0 +1,43 @@
+import pytest
+
+from broker import FAILED, QUEUED, SQLiteBroker
+from field_parser import FieldParser
+from ocr_service import OCRService
+from worker import OCRWorker
+
+@pytest.fixture
+def broker(tmp_path):
+    return SQLiteBroker(str(tmp_path / "queue.db"), max_attempts=3)
+
+@pytest.fixture
+def worker(broker):
+    return OCRWorker(broker, ocr_service=OCRService(), field_parser=FieldParser(), worker_id='w1')
+
+def test_corrupt_image_fails_without_retry(broker, worker):
+    task_id = broker.enqueue(b'not a png', 'scan.png', {'mode': 'text'})
+
+    worker.process(broker.claim('w1', 60))
+
+    status = broker.get_status(task_id)
+    assert (status['status'], status['status_code'], status['attempts']) == (FAILED, 500, 1)
+    assert broker.claim('w1', 60) is None
+
+def test_unsupported_format_fails_without_retry(broker, worker):
+    task_id = broker.enqueue(b'data', 'notes.docx', {'mode': 'text'})
+
+    worker.process(broker.claim('w1', 60))
+
+    assert broker.get_status(task_id)['status'] == FAILED
+
+def test_crash_is_retried(broker, worker, monkeypatch):
+    def crash(file_path, token=None):
+        raise RuntimeError("Tesseract was killed")
+
+    monkeypatch.setattr(worker.ocr_service, 'extract_text', crash)
+    task_id = broker.enqueue(b'data', 'scan.png', {'mode': 'text'})
+
+    worker.process(broker.claim('w1', 60))
+
+    status = broker.get_status(task_id)
+    assert (status['status'], status['error']) == \
+        (QUEUED, "Internal server error while processing file: Tesseract was killed")
@@ -1,4 +1,5 @@
 import os
+import hashlib
 from typing import Set, Optional
 from fastapi import UploadFile
 import aiofiles
@@ -33,21 +34,27 @@ def validate_file(file: UploadFile, max_size: int, allowed_extensions: Set[str])
     
     return None
 
-async def save_uploaded_file(file: UploadFile, file_path: str) -> None:
+async def save_uploaded_file(file: UploadFile, file_path: str) -> str:
     """
     Save uploaded file to specified path
     
     Args:
         file: Uploaded file object
         file_path: Path where file should be saved
+        
+    Returns:
+        str: SHA-256 hex digest of the file contents
     """
     try:
+        digest = hashlib.sha256()
         async with aiofiles.open(file_path, 'wb') as f:
             # Read file in chunks to handle large files
             while chunk := await file.read(8192):  # 8KB chunks
+                digest.update(chunk)
                 await f.write(chunk)
         
         logger.info(f"File saved successfully to {file_path}")
+        return digest.hexdigest()
         
     except Exception as e:
         logger.error(f"Error saving file to {file_path}: {str(e)}")
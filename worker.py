@@ -0,0 +1,216 @@
+"""
+OCR worker process for the broker-backed deployment.
+
+Workers lease document tasks from the broker, run OCRService and FieldParser
+on them and store the formatted result for the API to collect. With the
+SQLite broker, workers run on the same host as the API:
+
+    python worker.py --broker sqlite:////var/lib/ocr/queue.db --processes 4
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import socket
+import tempfile
+import threading
+import time
+import uuid
+import logging
+from typing import Optional
+
+import fitz  # PyMuPDF
+import pytesseract
+from PIL import Image, UnidentifiedImageError
+
+from autotune import DEFAULT_TOPOLOGY_FILE, apply_topology, load_topology
+from broker import Broker, BrokerTask, create_broker
+from extraction import ExtractionError, extract_report
+from field_parser import FieldParser
+from ocr_service import OCRService, CancellationToken
+from page_cache import PageCache
+
+logger = logging.getLogger(__name__)
+
+# Errors caused by the file itself, which fail the same way on every attempt:
+# unreadable or oversized images, unsupported formats, corrupt PDFs and
+# Tesseract rejecting the page. Crashes and I/O errors are retried
+INPUT_ERRORS = (
+    UnidentifiedImageError,
+    Image.DecompressionBombError,
+    ValueError,
+    fitz.FileDataError,
+    pytesseract.TesseractError,
+)
+
+class OCRWorker:
+    """Leases OCR tasks from a broker and processes them one at a time"""
+
+    def __init__(self, broker: Broker, ocr_service: Optional[OCRService] = None,
+                 field_parser: Optional[FieldParser] = None, worker_id: Optional[str] = None,
+                 visibility_timeout: float = 60.0, poll_interval: float = 1.0):
+        """
+        Initialize worker
+
+        Args:
+            broker: Broker to lease tasks from
+            ocr_service: OCR service, created with a page cache if not given
+            field_parser: Field parser, created if not given
+            worker_id: Unique worker identity, generated if not given
+            visibility_timeout: Lease duration in seconds; renewed every third of it
+            poll_interval: Seconds to wait when the queue is empty
+        """
+        self.broker = broker
+        self.ocr_service = ocr_service or OCRService(
+            page_cache=PageCache(max_entries=int(os.environ.get("PAGE_CACHE_SIZE", "512")))
+        )
+        self.field_parser = field_parser or FieldParser()
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.visibility_timeout = visibility_timeout
+        self.poll_interval = poll_interval
+
+    def run(self, stop_event: Optional[threading.Event] = None) -> None:
+        """
+        Process tasks until stop_event is set
+
+        A task in progress is finished before stopping.
+
+        Args:
+            stop_event: Event that ends the loop
+        """
+        stop_event = stop_event or threading.Event()
+        logger.info(f"Worker {self.worker_id} started")
+
+        while not stop_event.is_set():
+            try:
+                task = self.broker.claim(self.worker_id, self.visibility_timeout)
+            except Exception as e:
+                logger.error(f"Worker {self.worker_id} could not claim a task: {str(e)}")
+                task = None
+
+            if task is None:
+                stop_event.wait(self.poll_interval)
+                continue
+
+            self.process(task)
+
+        logger.info(f"Worker {self.worker_id} stopped")
+
+    def process(self, task: BrokerTask) -> None:
+        """
+        Process one leased task and report the outcome to the broker
+
+        Args:
+            task: Leased task
+        """
+        logger.info(f"Worker {self.worker_id} processing task {task.id} ({task.filename}, attempt {task.attempts})")
+
+        deadline_at = task.options.get('deadline_at')
+        if deadline_at is not None and time.time() >= deadline_at:
+            self.broker.fail(task.id, self.worker_id, "Processing deadline exceeded while queued",
+                             status_code=504, retry=False)
+            return
+
+        token = CancellationToken(deadline_at - time.time() if deadline_at is not None else None)
+        heartbeat_stop = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(task.id, token, heartbeat_stop), daemon=True)
+        heartbeat.start()
+
+        file_ext = os.path.splitext(task.filename)[1]
+        temp_file_path = None
+
+        try:
+            with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as temp_file:
+                temp_file_path = temp_file.name
+                temp_file.write(task.payload)
+
+            result = extract_report(self.ocr_service, self.field_parser, temp_file_path, task.filename,
+                                    task.options.get('mode', 'text'), token)
+            self.broker.complete(task.id, self.worker_id, result)
+
+        except ExtractionError as e:
+            if token.cancelled:
+                logger.info(f"Task {task.id} was deleted or its lease was lost")
+            else:
+                self.broker.fail(task.id, self.worker_id, e.detail, status_code=e.status_code, retry=False)
+        except INPUT_ERRORS as e:
+            logger.error(f"Error processing task {task.id}: {str(e)}")
+            self.broker.fail(task.id, self.worker_id, f"Internal server error while processing file: {str(e)}",
+                             retry=False)
+        except Exception as e:
+            logger.error(f"Error processing task {task.id}: {str(e)}")
+            self.broker.fail(task.id, self.worker_id, f"Internal server error while processing file: {str(e)}")
+        finally:
+            heartbeat_stop.set()
+            heartbeat.join()
+
+            # Clean up temporary file
+            if temp_file_path and os.path.exists(temp_file_path):
+                os.unlink(temp_file_path)
+
+    def _heartbeat(self, task_id: str, token: CancellationToken, stop: threading.Event) -> None:
+        """Renew the lease until stopped; cancel the work if the lease is lost or the task deleted"""
+        while not stop.wait(self.visibility_timeout / 3):
+            try:
+                if not self.broker.extend(task_id, self.worker_id, self.visibility_timeout):
+                    token.cancel()
+                    return
+            except Exception as e:
+                logger.warning(f"Could not renew lease on task {task_id}: {str(e)}")
+
+def _run_worker(broker_url: str, visibility_timeout: float, poll_interval: float,
+                topology_file: Optional[str] = None) -> None:
+    """Run one worker in this process until SIGTERM or SIGINT"""
+    logging.basicConfig(level=logging.INFO)
+
+    stop_event = threading.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: stop_event.set())
+
+    worker = OCRWorker(create_broker(broker_url), visibility_timeout=visibility_timeout,
+                       poll_interval=poll_interval)
+
+    topology = load_topology(topology_file) if topology_file else None
+    if topology is not None:
+        apply_topology(worker.ocr_service, topology)
+
+    worker.run(stop_event)
+
+def main() -> None:
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description="Run OCR worker processes")
+    parser.add_argument('--broker', default=os.environ.get("OCR_BROKER_URL"),
+                        help="Broker URL, e.g. sqlite:////var/lib/ocr/queue.db (default: $OCR_BROKER_URL)")
+    parser.add_argument('--processes', type=int,
+                        help="Worker processes to run (default: the calibrated number of workers, or 1)")
+    parser.add_argument('--visibility-timeout', type=float, default=60.0,
+                        help="Seconds before a task held by an unresponsive worker is retried")
+    parser.add_argument('--poll-interval', type=float, default=1.0, help="Seconds between polls of an empty queue")
+    parser.add_argument('--topology', default=os.environ.get("OCR_TOPOLOGY_FILE", DEFAULT_TOPOLOGY_FILE),
+                        help="Topology file written by autotune.py (default: $OCR_TOPOLOGY_FILE or ocr_topology.json)")
+    args = parser.parse_args()
+
+    if not args.broker:
+        parser.error("--broker or OCR_BROKER_URL is required")
+
+    if args.processes is None:
+        topology = load_topology(args.topology)
+        args.processes = topology.workers if topology is not None else 1
+
+    worker_args = (args.broker, args.visibility_timeout, args.poll_interval, args.topology)
+    if args.processes == 1:
+        _run_worker(*worker_args)
+        return
+
+    processes = [multiprocessing.Process(target=_run_worker, args=worker_args) for _ in range(args.processes)]
+    for process in processes:
+        process.start()
+
+    # Forward termination to the workers and wait for them to finish their tasks
+    signal.signal(signal.SIGTERM, lambda *_: [p.terminate() for p in processes])
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    for process in processes:
+        process.join()
+
+if __name__ == "__main__":
+    main()